@@ -1,13 +1,21 @@
-from datetime import datetime, timedelta
-from typing import Optional
+import asyncio
+import math
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from pydantic import ValidationError
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from database import get_db
-from models import User
-from schemas import TokenData
+from database import AsyncDB, get_async_db
+from models import TokenRevocation, User
+from schemas import TokenClaims, User as UserSchema
+from cache import TTLCache
+from invalidation import invalidation_bus
 import os
 from dotenv import load_dotenv
 
@@ -23,6 +31,20 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
 pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# Token'ın başka bir yolla da kabul edildiği endpoint'ler için (ör. /metrics ve METRICS_TOKEN)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+# Kimliği doğrulanmış kullanıcılar için önbellek (anahtar: token "sub" değeri)
+user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("USER_CACHE_TTL_SECONDS", "60")),
+)
+
+def invalidate_cached_user(email: str) -> None:
+    # Diğer worker'lardaki önbellek de bus üzerinden temizlenir
+    invalidation_bus.publish("users", email)
+
+invalidation_bus.subscribe("users", user_cache.invalidate)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -30,37 +52,186 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+# Şifre işlemleri yavaş olduğu için sınırlı bir havuzda çalıştırılır
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+
+_password_pool: Optional[Executor] = None
+_password_pool_lock = threading.Lock()
+_password_pool_stats = {"queued": 0, "completed": 0}
+
+def _get_password_pool() -> Executor:
+    global _password_pool
+    with _password_pool_lock:
+        if _password_pool is None:
+            if PASSWORD_HASH_EXECUTOR == "process":
+                _password_pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+            else:
+                _password_pool = ThreadPoolExecutor(
+                    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+                )
+        return _password_pool
+
+def _password_task_done(future: Future) -> None:
+    with _password_pool_lock:
+        _password_pool_stats["queued"] -= 1
+        _password_pool_stats["completed"] += 1
+
+def _submit_password_task(func: Callable[..., Any], *args: Any) -> Future:
+    pool = _get_password_pool()
+    with _password_pool_lock:
+        _password_pool_stats["queued"] += 1
+    future = pool.submit(func, *args)
+    future.add_done_callback(_password_task_done)
+    return future
+
+def run_in_password_pool(func: Callable[..., Any], *args: Any) -> Any:
+    return _submit_password_task(func, *args).result()
+
+async def run_in_password_pool_async(func: Callable[..., Any], *args: Any) -> Any:
+    return await asyncio.wrap_future(_submit_password_task(func, *args))
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await run_in_password_pool_async(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await run_in_password_pool_async(get_password_hash, password)
+
+def password_pool_stats() -> Dict[str, Any]:
+    with _password_pool_lock:
+        return {
+            "executor": PASSWORD_HASH_EXECUTOR,
+            "max_workers": PASSWORD_HASH_WORKERS,
+            "queue_depth": _password_pool_stats["queued"],
+            "completed": _password_pool_stats["completed"],
+        }
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    # iat: silinen kullanıcının id'si yeniden verilirse eski token'lar ayırt edilir
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    credentials_exception = HTTPException(
+def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email).first()
+
+def user_token_data(user: User) -> dict:
+    # uid/role/tv claim'leri okuma endpoint'lerinin veritabanına gitmeden yetki kontrolü yapmasını sağlar
+    return {"sub": user.email, "uid": user.id, "role": user.role.value, "tv": user.token_version}
+
+# Kullanıcı başına geçerli en düşük token sürümü; pasif kullanıcılar için sonsuz.
+# Yalnızca token sürümü artmış veya pasif kullanıcıları içerir, bu yüzden küçük kalır.
+_token_floors: Dict[int, float] = {}
+# Silinen kullanıcı id -> silinme zamanı (epoch saniye). SQLite silinen en büyük id'yi
+# yeniden verebildiği için sonsuz taban yerine bu andan önce verilen token'lar reddedilir.
+_deleted_users: Dict[int, float] = {}
+_token_floors_lock = threading.Lock()
+
+def _epoch(moment: datetime) -> float:
+    # SQLite zaman damgaları UTC ve saat dilimsiz döner
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+def _apply_token_revocation(key: str) -> None:
+    user_id, _, state = key.partition(":")
+    with _token_floors_lock:
+        if state.startswith("deleted@"):
+            _token_floors.pop(int(user_id), None)
+            _deleted_users[int(user_id)] = float(state[len("deleted@"):])
+        else:
+            _token_floors[int(user_id)] = math.inf if state == "revoked" else int(state)
+
+invalidation_bus.subscribe("revocations", _apply_token_revocation)
+
+def revoke_user_tokens(user_id: int, token_version: Optional[int] = None) -> None:
+    """token_version'dan eski token'ları geçersiz kılar; None ise kullanıcının tüm token'larını."""
+    state = "revoked" if token_version is None else str(token_version)
+    invalidation_bus.publish("revocations", f"{user_id}:{state}")
+
+def record_deleted_user(db: Session, user_id: int) -> datetime:
+    # Kullanıcı silme ile aynı işlemde yazılır; commit ve yayın çağırana bırakılır
+    revoked_at = datetime.now(timezone.utc)
+    db.merge(TokenRevocation(user_id=user_id, revoked_at=revoked_at))
+    return revoked_at
+
+def revoke_deleted_user_tokens(user_id: int, revoked_at: datetime) -> None:
+    invalidation_bus.publish("revocations", f"{user_id}:deleted@{_epoch(revoked_at)}")
+
+def load_token_revocations(db: Session) -> None:
+    rows = db.query(User.id, User.token_version, User.is_active).filter(
+        or_(User.token_version > 0, User.is_active.is_(False))
+    ).all()
+    # Token süresinden eski silmeler artık geçerli bir token'ı etkileyemez
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    deleted = db.query(TokenRevocation.user_id, TokenRevocation.revoked_at).filter(
+        TokenRevocation.revoked_at >= cutoff
+    ).all()
+    with _token_floors_lock:
+        _token_floors.clear()
+        for user_id, token_version, is_active in rows:
+            _token_floors[user_id] = token_version if is_active else math.inf
+        _deleted_users.clear()
+        for user_id, revoked_at in deleted:
+            _deleted_users[user_id] = _epoch(revoked_at)
+
+def token_revocation_stats() -> Dict[str, Any]:
+    with _token_floors_lock:
+        return {
+            "tracked_users": len(_token_floors),
+            "revoked_users": sum(1 for floor in _token_floors.values() if floor == math.inf),
+            "deleted_users": len(_deleted_users),
+        }
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Geçersiz kimlik bilgileri",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_token_claims(token: str) -> TokenClaims:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.email == token_data.email).first()
-    if user is None:
-        raise credentials_exception
+        claims = TokenClaims(
+            id=payload["uid"],
+            email=payload["sub"],
+            role=payload["role"],
+            token_version=payload.get("tv", 0),
+            issued_at=payload.get("iat", 0),
+        )
+    except (JWTError, KeyError, ValidationError):
+        # uid/role içermeyen eski token'lar da reddedilir; istemci yeniden giriş yapar
+        raise _credentials_exception()
+    if claims.token_version < _token_floors.get(claims.id, 0):
+        raise _credentials_exception()
+    if claims.issued_at <= _deleted_users.get(claims.id, -1):
+        raise _credentials_exception()
+    return claims
+
+async def get_token_claims(token: str = Depends(oauth2_scheme)) -> TokenClaims:
+    """Yalnızca imza ve iptal listesi kontrolü; salt okunur endpoint'ler için."""
+    return decode_token_claims(token)
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncDB = Depends(get_async_db)) -> UserSchema:
+    claims = decode_token_claims(token)
+    user = user_cache.get(claims.email)
+    if user is not None:
+        return user
+    db_user = await db.run_sync(get_user_by_email, claims.email)
+    if db_user is None:
+        raise _credentials_exception()
+    # ORM nesnesi oturum kapanınca kullanılamaz; şema kopyası saklanır
+    user = UserSchema.model_validate(db_user)
+    user_cache.set(claims.email, user)
     return user
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user(current_user: UserSchema = Depends(get_current_user)) -> UserSchema:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Kullanıcı aktif değil")
     return current_user 
\ No newline at end of file
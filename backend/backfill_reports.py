@@ -0,0 +1,35 @@
+import argparse
+import logging
+from datetime import date
+
+from database import SessionLocal, engine, upgrade_schema
+import models
+from rollups import backfill_rollups
+
+# Loglama ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rapor özet tablolarını sipariş geçmişinden yeniden hesaplar")
+    parser.add_argument("--start", type=date.fromisoformat, help="başlangıç günü (YYYY-MM-DD), varsayılan: ilk sipariş")
+    parser.add_argument("--end", type=date.fromisoformat, help="bitiş günü (YYYY-MM-DD), varsayılan: son sipariş")
+    parser.add_argument("--chunk-days", type=int, default=7, help="tek işlemde yeniden hesaplanacak gün sayısı")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    upgrade_schema(models.Base.metadata)
+
+    db = SessionLocal()
+    try:
+        days = backfill_rollups(db, args.start, args.end, args.chunk_days)
+        logger.info(f"{days} günlük rapor özeti yeniden hesaplandı")
+    except Exception as e:
+        logger.error(f"Rapor özetleri hesaplanırken hata: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""API yük ve gecikme ölçümü.
+
+Geçici bir SQLite veritabanına gerçekçi bir veri seti yükler, main.app'e
+karışık istekler gönderir ve endpoint başına p50/p95/p99 gecikme ile
+throughput değerlerini JSON olarak raporlar. Ayrıca sipariş listesinin
+response_model yolu ile önceden derlenmiş TypeAdapter yolundaki
+serileştirme süresini karşılaştırır.
+
+    python benchmark.py --orders 20000 --requests 2000 --output sonuc.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    sys.exit("Benchmark için httpx gerekli: pip install httpx")
+
+STAFF_PASSWORD = "benchmark123"
+ADMIN_EMAIL = "admin@restaurant.com"
+ADMIN_PASSWORD = "admin123"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Restaurant API benchmark")
+    parser.add_argument("--orders", type=int, default=20000, help="seed edilecek geçmiş sipariş sayısı")
+    parser.add_argument("--tables", type=int, default=200)
+    parser.add_argument("--menu-items", type=int, default=60)
+    parser.add_argument("--staff", type=int, default=80, help="giriş yapacak garson/mutfak kullanıcısı")
+    parser.add_argument("--requests", type=int, default=2000, help="karışık yükteki istek sayısı")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--serialize-orders", type=int, default=500, help="serileştirme karşılaştırmasındaki sipariş sayısı")
+    parser.add_argument("--serialize-rounds", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="SQLite dosyası (varsayılan: geçici dosya)")
+    parser.add_argument("--output", help="JSON raporun yazılacağı dosya (varsayılan: stdout)")
+    return parser.parse_args()
+
+
+def seed_database(args: argparse.Namespace, rng: random.Random) -> Dict[str, list]:
+    # Modüller DATABASE_URL okunduktan sonra içe aktarılmalı
+    from sqlalchemy import insert
+    from database import engine, upgrade_schema
+    from auth import get_password_hash
+    from models import Base, MenuItem, Order, OrderItem, Table, User
+    from schemas import Category, OrderStatus, UserRole
+
+    Base.metadata.create_all(bind=engine)
+    upgrade_schema(Base.metadata)
+
+    staff_hash = get_password_hash(STAFF_PASSWORD)
+    users = [{
+        "id": 1,
+        "email": ADMIN_EMAIL,
+        "hashed_password": get_password_hash(ADMIN_PASSWORD),
+        "full_name": "Admin User",
+        "role": UserRole.ADMIN,
+        "is_active": True,
+    }]
+    for index in range(args.staff):
+        role = UserRole.KITCHEN if index % 4 == 0 else UserRole.WAITER
+        users.append({
+            "id": index + 2,
+            "email": f"{role.value}{index}@restaurant.com",
+            "hashed_password": staff_hash,
+            "full_name": f"Staff {index}",
+            "role": role,
+            "is_active": True,
+        })
+
+    categories = list(Category)
+    menu_items = [
+        {
+            "id": index + 1,
+            "name": f"Item {index + 1}",
+            "description": f"Benchmark menu item {index + 1}",
+            "price": round(rng.uniform(20, 400), 2),
+            "category": categories[index % len(categories)],
+            "is_available": True,
+        }
+        for index in range(args.menu_items)
+    ]
+    tables = [
+        {"id": number, "number": number, "capacity": rng.choice([2, 4, 4, 6, 8]), "is_occupied": False}
+        for number in range(1, args.tables + 1)
+    ]
+
+    now = datetime.utcnow()
+    orders, order_items = [], []
+    active_statuses = [OrderStatus.PENDING, OrderStatus.PREPARING]
+    for order_id in range(1, args.orders + 1):
+        # Son ~150 sipariş mutfakta aktif, geri kalanı geçmiş
+        recent = order_id > args.orders - 150
+        status = rng.choice(active_statuses) if recent else OrderStatus.DELIVERED
+        created_at = now - timedelta(minutes=rng.randint(0, 90) if recent else rng.randint(90, 365 * 24 * 60))
+        total = 0.0
+        for _ in range(rng.randint(1, 5)):
+            menu_item = rng.choice(menu_items)
+            quantity = rng.randint(1, 3)
+            total += menu_item["price"] * quantity
+            order_items.append({
+                "order_id": order_id,
+                "menu_item_id": menu_item["id"],
+                "quantity": quantity,
+                "price_at_time": menu_item["price"],
+                "created_at": created_at,
+            })
+        orders.append({
+            "id": order_id,
+            "user_id": rng.randint(2, args.staff + 1) if args.staff else 1,
+            "table_id": rng.randint(1, args.tables),
+            "status": status,
+            "total_amount": round(total, 2),
+            "created_at": created_at,
+        })
+    orders.sort(key=lambda order: order["created_at"])
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), users)
+        conn.execute(insert(MenuItem), menu_items)
+        conn.execute(insert(Table), tables)
+        for start in range(0, len(orders), 5000):
+            conn.execute(insert(Order), orders[start:start + 5000])
+        for start in range(0, len(order_items), 5000):
+            conn.execute(insert(OrderItem), order_items[start:start + 5000])
+
+    return {
+        "staff": [user["email"] for user in users[1:]],
+        "menu_items": menu_items,
+        "table_ids": [table["id"] for table in tables],
+        "active_orders": {order["id"]: order["status"].value for order in orders if order["status"] in active_statuses},
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.started: Dict[str, float] = {}
+        self.finished: Dict[str, float] = {}
+
+    async def call(self, name: str, request: Callable[[], "asyncio.Future"]) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        self.started.setdefault(name, start)
+        try:
+            response = await request()
+        except Exception:
+            response = None
+        elapsed = time.perf_counter() - start
+        self.finished[name] = time.perf_counter()
+        self.latencies[name].append(elapsed * 1000)
+        if response is None or response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+    def report(self) -> Dict[str, dict]:
+        report = {}
+        for name, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            duration = max(self.finished[name] - self.started[name], 1e-9)
+            report[name] = {
+                "count": len(values),
+                "errors": self.errors[name],
+                "mean_ms": round(statistics.fmean(values), 3),
+                "p50_ms": round(percentile(values, 50), 3),
+                "p95_ms": round(percentile(values, 95), 3),
+                "p99_ms": round(percentile(values, 99), 3),
+                "max_ms": round(values[-1], 3),
+                "throughput_rps": round(len(values) / duration, 1),
+            }
+        return report
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+async def gather_limited(concurrency: int, tasks: List[Callable[[], "asyncio.Future"]]) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(task):
+        async with semaphore:
+            await task()
+
+    await asyncio.gather(*(run(task) for task in tasks))
+
+
+async def run_workloads(args: argparse.Namespace, data: Dict[str, list], rng: random.Random) -> Dict[str, dict]:
+    from main import app
+
+    recorder = Recorder()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        admin = await client.post("/token", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+        admin_headers = {"Authorization": f"Bearer {admin.json()['access_token']}"}
+
+        # 1) Vardiya değişimi: tüm personel aynı anda giriş yapar
+        tokens: List[str] = []
+
+        async def login(email: str):
+            response = await recorder.call(
+                "POST /token",
+                lambda: client.post("/token", data={"username": email, "password": STAFF_PASSWORD}),
+            )
+            if response is not None and response.status_code == 200:
+                tokens.append(response.json()["access_token"])
+
+        await gather_limited(args.concurrency, [lambda email=email: login(email) for email in data["staff"]])
+        staff_headers = [{"Authorization": f"Bearer {token}"} for token in tokens] or [admin_headers]
+
+        # 2) Karışık servis yükü
+        menu_items = data["menu_items"]
+        active_orders = dict(data["active_orders"])
+        next_status = {"pending": "preparing", "preparing": "ready", "ready": "delivered"}
+
+        def create_order():
+            items = [
+                {"menu_item_id": item["id"], "quantity": rng.randint(1, 3), "price": item["price"]}
+                for item in rng.sample(menu_items, rng.randint(1, 4))
+            ]
+            body = {"table_id": rng.choice(data["table_ids"]), "items": items}
+            return recorder.call(
+                "POST /orders",
+                lambda: client.post("/orders", json=body, headers=rng.choice(staff_headers)),
+            )
+
+        def update_status():
+            # Mutfak siparişi geçerli bir sonraki duruma taşır (pending -> preparing -> ready -> delivered)
+            if not active_orders:
+                return read_active_orders()
+            order_id = rng.choice(list(active_orders))
+            status = next_status[active_orders[order_id]]
+            if status == "delivered":
+                del active_orders[order_id]
+            else:
+                active_orders[order_id] = status
+            return recorder.call(
+                "PUT /orders/{id}/status",
+                lambda: client.put(f"/orders/{order_id}/status", params={"status": status}, headers=admin_headers),
+            )
+
+        def read_public_menu():
+            return recorder.call("GET /menu/", lambda: client.get("/menu/"))
+
+        def read_menu_items():
+            return recorder.call(
+                "GET /menu/items",
+                lambda: client.get("/menu/items", headers=rng.choice(staff_headers)),
+            )
+
+        def read_active_orders():
+            return recorder.call(
+                "GET /orders/active",
+                lambda: client.get("/orders/active", headers=rng.choice(staff_headers)),
+            )
+
+        def read_tables():
+            return recorder.call(
+                "GET /tables",
+                lambda: client.get("/tables", headers=rng.choice(staff_headers)),
+            )
+
+        def read_order_history():
+            return recorder.call(
+                "GET /orders",
+                lambda: client.get("/orders", params={"limit": 100}, headers=admin_headers),
+            )
+
+        workload = [
+            (read_public_menu, 30),
+            (read_menu_items, 10),
+            (create_order, 20),
+            (read_active_orders, 15),
+            (update_status, 10),
+            (read_tables, 10),
+            (read_order_history, 5),
+        ]
+        operations, weights = zip(*workload)
+        tasks = [rng.choices(operations, weights)[0] for _ in range(args.requests)]
+        started = time.perf_counter()
+        await gather_limited(args.concurrency, tasks)
+        mixed_seconds = time.perf_counter() - started
+
+    report = recorder.report()
+    report["_mixed"] = {
+        "requests": args.requests,
+        "seconds": round(mixed_seconds, 3),
+        "throughput_rps": round(args.requests / mixed_seconds, 1),
+    }
+    return report
+
+
+async def benchmark_serialization(args: argparse.Namespace) -> Dict[str, dict]:
+    """GET /orders gövdesini FastAPI'nin response_model yolu ve önceden derlenmiş adaptörle üretir."""
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+
+    from database import SessionLocal
+    from main import app
+    from routes.orders import list_orders
+    from serialization import dump_json, order_list_adapter
+
+    route = next(
+        route for route in app.routes
+        if getattr(route, "path", None) == "/orders" and "GET" in route.methods
+    )
+    with SessionLocal() as db:
+        orders = list_orders(db, limit=args.serialize_orders)
+
+    async def response_model_path() -> bytes:
+        content = await serialize_response(field=route.response_field, response_content=orders)
+        return JSONResponse(content).body
+
+    async def adapter_path() -> bytes:
+        return dump_json(order_list_adapter, orders)
+
+    paths = {"response_model": response_model_path, "type_adapter": adapter_path}
+    timings: Dict[str, List[float]] = defaultdict(list)
+    bodies = {}
+    # Yollar sırayla dönüşümlü çalışır ki makinedeki dalgalanma ikisini eşit etkilesin
+    for _ in range(args.serialize_rounds):
+        for name, render in paths.items():
+            gc.collect()
+            start = time.perf_counter()
+            bodies[name] = await render()
+            timings[name].append((time.perf_counter() - start) * 1000)
+
+    report = {}
+    for name in paths:
+        values = sorted(timings[name])
+        report[name] = {
+            "mean_ms": round(statistics.fmean(values), 3),
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "bytes": len(bodies[name]),
+        }
+    report["_summary"] = {
+        "orders": len(orders),
+        "rounds": args.serialize_rounds,
+        "speedup": round(report["response_model"]["p50_ms"] / max(report["type_adapter"]["p50_ms"], 1e-9), 2),
+        "same_payload": json.loads(bodies["response_model"]) == json.loads(bodies["type_adapter"]),
+    }
+    return report
+
+
+def main() -> None:
+    args = parse_args()
+    rng = random.Random(args.seed)
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="restaurant-bench-"), "benchmark.db")
+    if os.path.exists(db_path):
+        sys.exit(f"{db_path} zaten mevcut; benchmark boş bir veritabanı ister")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    seed_started = time.perf_counter()
+    data = seed_database(args, rng)
+    seed_seconds = time.perf_counter() - seed_started
+
+    report = {
+        "config": {
+            key: value for key, value in vars(args).items() if key not in ("output",)
+        },
+        "database": db_path,
+        "seed_seconds": round(seed_seconds, 3),
+        "endpoints": asyncio.run(run_workloads(args, data, rng)),
+        "serialization": asyncio.run(benchmark_serialization(args)),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm.exc import StaleDataError
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Callable, Union
 import os
+import threading
 from dotenv import load_dotenv
 
 # .env dosyasını yükle
@@ -9,16 +15,158 @@ load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./restaurant.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Sunucu veritabanları (Postgres vb.) için bağlantı havuzu ayarları
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# SQLite ayarları: WAL ile yazarlar okuyucuları bloklamaz
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+pool_metrics = {"connects": 0, "checkouts": 0, "checkins": 0, "checked_out": 0, "max_checked_out": 0}
+_pool_metrics_lock = threading.Lock()
+
+def _on_connect(dbapi_connection, connection_record):
+    with _pool_metrics_lock:
+        pool_metrics["connects"] += 1
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    with _pool_metrics_lock:
+        pool_metrics["checkouts"] += 1
+        pool_metrics["checked_out"] += 1
+        pool_metrics["max_checked_out"] = max(pool_metrics["max_checked_out"], pool_metrics["checked_out"])
+
+def _on_checkin(dbapi_connection, connection_record):
+    with _pool_metrics_lock:
+        pool_metrics["checkins"] += 1
+        pool_metrics["checked_out"] -= 1
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.close()
+
+def _engine_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+def _instrument_engine(db_engine: Engine, url: str) -> None:
+    if url.startswith("sqlite"):
+        event.listen(db_engine, "connect", _set_sqlite_pragmas)
+    event.listen(db_engine, "connect", _on_connect)
+    event.listen(db_engine, "checkout", _on_checkout)
+    event.listen(db_engine, "checkin", _on_checkin)
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL) -> Engine:
+    db_engine = create_engine(url, **_engine_options(url))
+    _instrument_engine(db_engine, url)
+    return db_engine
+
+def _async_driver_url(url: str) -> str:
+    # DATABASE_URL senkron sürücüyle yazılır; async katman için eşdeğer sürücü seçilir
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:") or url.startswith("postgres:"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+def create_async_db_engine(url: str = SQLALCHEMY_DATABASE_URL):
+    async_db_engine = create_async_engine(_async_driver_url(url), **_engine_options(url))
+    _instrument_engine(async_db_engine.sync_engine, url)
+    return async_db_engine
+
+def db_pool_stats() -> dict:
+    with _pool_metrics_lock:
+        stats = dict(pool_metrics)
+    stats["pool"] = engine.pool.status()
+    if async_engine is not None:
+        stats["async_pool"] = async_engine.pool.status()
+    return stats
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# DB_ASYNC=true ile endpoint'ler aiosqlite/asyncpg üzerinden AsyncSession kullanır
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    async_engine = create_async_db_engine()
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+def upgrade_schema(metadata) -> None:
+    # create_all mevcut tablolara yeni sütun ve indeks eklemez; eksikleri burada tamamla
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT '{column.server_default.arg}'"
+                conn.execute(text(ddl))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def flush_versioned(db: Session) -> bool:
+    # Sürümlü modellerde koşullu UPDATE satır bulamazsa kayıt başka bir istekte değişmiştir
+    try:
+        db.flush()
+        return True
+    except StaleDataError:
+        db.rollback()
+        return False
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+class ThreadedSession:
+    """Senkron Session'ı AsyncSession.run_sync arayüzüyle threadpool'da çalıştırır.
+
+    Böylece endpoint'ler DB_ASYNC ayarından bağımsız olarak aynı kodla
+    ``await db.run_sync(fonksiyon, ...)`` şeklinde yazılır.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    async def run_sync(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+AsyncDB = Union[AsyncSession, ThreadedSession]
+
+async def get_async_db():
+    if DB_ASYNC:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield ThreadedSession(db)
+        finally:
+            db.close() 
\ No newline at end of file
@@ -0,0 +1,72 @@
+import threading
+import uuid
+import zlib
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from invalidation import invalidation_bus
+
+# Sayaçlar süreç içinde tutulur. Süreç kimliği ETag'e eklenir ki yeniden başlayan
+# ya da başka bir worker aynı sayaç değerini farklı veri için üretmesin.
+_PROCESS_ID = uuid.uuid4().hex[:8]
+
+
+class DataVersions:
+    """Kanal başına veri sürümü; yazma bildirimleri geldikçe artar.
+
+    ETag gövdeden değil bu sayaçtan üretildiği için koşullu isteklerde
+    sorgu ve serileştirme yapılmadan 304 dönülebilir.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, channel: str) -> int:
+        return self._versions.get(channel, 0)
+
+    def bump(self, channel: str) -> None:
+        with self._lock:
+            self._versions[channel] = self._versions.get(channel, 0) + 1
+
+    def watch(self, channel: str) -> None:
+        # Hem bu worker'ın hem diğer worker'ların yazmaları sürümü artırır
+        invalidation_bus.subscribe(channel, lambda key: self.bump(channel))
+
+
+data_versions = DataVersions()
+for _channel in ("orders", "tables"):
+    data_versions.watch(_channel)
+
+
+def data_etag(request: Request, channel: str) -> str:
+    # Sürüm sorgudan önce okunmalı; arada gelen yazma bir sonraki istekte yakalanır
+    tag = f"{_PROCESS_ID}-{channel}-{data_versions.get(channel)}"
+    if request.url.query:
+        tag += f"-{zlib.crc32(request.url.query.encode()):08x}"
+    return f'W/"{tag}"'
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match için zayıf karşılaştırma (RFC 9110 13.1.2)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque_tag(etag) in {_opaque_tag(tag) for tag in header.split(",")}
+
+
+def cache_headers(etag: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    # no-cache: istemci saklar ama her kullanımda ETag ile doğrular
+    return {"ETag": etag, "Cache-Control": "no-cache", **(headers or {})}
+
+
+def not_modified_response(etag: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag, headers))
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import secrets
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from invalidation import InvalidationBus, invalidation_bus
+
+# SSE bağlantılarını canlı tutmak için boş yorum satırı gönderme aralığı (saniye)
+HEARTBEAT_SECONDS = 15
+# Sıra numarasının alt bitleri; üst bitler sürece özgü dönem (epoch) numarasıdır
+_SEQ_BITS = 32
+# İmleçler JavaScript'te tam sayı olarak kalmalı (2**53)
+_EPOCH_LIMIT = 2 ** (53 - _SEQ_BITS)
+# İstemciye ve akıştan beslenen projeksiyonlara baştan yüklemesini söyleyen olay
+RESET_EVENT = "reset"
+
+
+class EventFeed:
+    """Sıra numaralı, sınırlı uzunlukta olay akışı.
+
+    Olaylar senkron endpoint'lerden (threadpool) yayınlanır, SSE
+    aboneleri ise event loop üzerinde bekler. Sıra numaraları süreç başına
+    rastgele bir dönemle başlar; başka bir worker'ın ya da yeniden başlamadan
+    önceki sürecin imleci bu akışa ait sayılmaz ve istemci sıfırlanır.
+    """
+
+    def __init__(self, maxlen: int = 1000):
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=maxlen)
+        self._epoch = 1 + secrets.randbelow(_EPOCH_LIMIT - 1)
+        self._seq = self._epoch << _SEQ_BITS
+        self._lock = threading.Lock()
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    @property
+    def cursor(self) -> int:
+        return self._seq
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._seq += 1
+            event = {"id": self._seq, "type": event_type, "data": data}
+            self._events.append(event)
+            waiters = list(self._waiters)
+        for loop, ready in waiters:
+            loop.call_soon_threadsafe(ready.set)
+        return event
+
+    def since(self, cursor: int) -> Optional[List[Dict[str, Any]]]:
+        """cursor'dan sonraki olaylar; arada kaybolan olay varsa None."""
+        with self._lock:
+            if cursor >> _SEQ_BITS != self._epoch or cursor > self._seq:
+                # İmleç başka bir worker'a ya da yeniden başlamadan önceki sürece ait
+                return None
+            if cursor == self._seq:
+                return []
+            if not self._events or self._events[0]["id"] > cursor + 1:
+                return None
+            return [event for event in self._events if event["id"] > cursor]
+
+    async def subscribe(self, cursor: int) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yeni olayları üretir; heartbeat zamanı geldiğinde None üretir."""
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        waiter = (loop, ready)
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            while True:
+                events = self.since(cursor)
+                if events is None:
+                    yield {"id": self._seq, "type": RESET_EVENT, "data": {}}
+                    cursor = self._seq
+                    continue
+                for event in events:
+                    cursor = event["id"]
+                    yield event
+                ready.clear()
+                if self._seq > cursor:
+                    continue
+                try:
+                    await asyncio.wait_for(ready.wait(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+def _format_sse(event: Dict[str, Any]) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+def sse_response(feed: EventFeed, request: Request, cursor: Optional[int] = None) -> StreamingResponse:
+    # Yeniden bağlanan istemci Last-Event-ID başlığı ile kaldığı yerden devam eder
+    if cursor is None:
+        last_event_id = request.headers.get("last-event-id")
+        cursor = int(last_event_id) if last_event_id and last_event_id.isdigit() else feed.cursor
+
+    async def stream():
+        yield f"retry: 3000\nid: {cursor}\n\n"
+        async for event in feed.subscribe(cursor):
+            if await request.is_disconnected():
+                break
+            yield ": heartbeat\n\n" if event is None else _format_sse(event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def follow_remote(feed: EventFeed, channel: str, bus: InvalidationBus = invalidation_bus) -> None:
+    """Diğer worker'ların bu kanaldaki yazmalarını akışa "reset" olayı olarak ekler.
+
+    Olayın verisi yalnızca yazan worker'ın akışındadır; buradaki SSE istemcileri
+    ve projeksiyonlar reset ile güncel durumu yeniden yükler.
+    """
+    bus.subscribe(channel, lambda key: feed.publish(RESET_EVENT, {}), include_local=False)
+
+
+# Mutfak ekranları için sipariş olayları
+order_feed = EventFeed()
+follow_remote(order_feed, "orders")
+
+# Garson tabletleri için masa olayları
+table_feed = EventFeed()
+follow_remote(table_feed, "tables")
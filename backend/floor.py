@@ -0,0 +1,232 @@
+import os
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from cache import TTLCache
+from database import AsyncDB
+from etags import data_versions
+from events import RESET_EVENT, EventFeed, table_feed
+from models import Table as TableModel, TableSession
+from schemas import Table, TableStatus, TableTurnTime
+
+# Dönüş süresi istatistikleri masa verisi değişene kadar, en fazla bu süre saklanır
+TURN_TIME_CACHE_SECONDS = float(os.getenv("TURN_TIME_CACHE_SECONDS", "60"))
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _seconds_between(start: datetime, end: datetime) -> int:
+    # SQLite zaman damgaları UTC ve saat dilimsiz döner
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    return max(int((end - start).total_seconds()), 0)
+
+
+def _close_session(db: Session, db_table: TableModel, now: datetime) -> None:
+    session = db.query(TableSession).filter(
+        TableSession.table_id == db_table.id,
+        TableSession.cleared_at.is_(None),
+    ).order_by(TableSession.id.desc()).first()
+    if session is not None:
+        session.cleared_at = now
+        session.turn_seconds = _seconds_between(session.seated_at, now)
+    db_table.seated_at = None
+    db_table.party_size = None
+
+
+def set_table_status(
+    db: Session,
+    db_table: TableModel,
+    status: TableStatus,
+    party_size: Optional[int] = None,
+) -> None:
+    """Masa durumunu değiştirir ve oturum geçmişini tutar.
+
+    OCCUPIED'a geçişte oturum açılır, OCCUPIED'dan çıkışta kapatılır.
+    Commit çağırana bırakılır; durum değişikliğiyle aynı işlemde yazılır.
+    """
+    previous = db_table.status
+    db_table.status = status
+    db_table.is_occupied = status == TableStatus.OCCUPIED
+    now = _utcnow()
+    if status == TableStatus.OCCUPIED and previous != TableStatus.OCCUPIED:
+        db.add(TableSession(table_id=db_table.id, party_size=party_size, seated_at=now))
+        db_table.seated_at = now
+        db_table.party_size = party_size
+    elif status != TableStatus.OCCUPIED and previous == TableStatus.OCCUPIED:
+        _close_session(db, db_table, now)
+    elif status == TableStatus.OCCUPIED and party_size is not None:
+        # Gruba katılan ya da ayrılan misafirler: açık oturumun kişi sayısı güncellenir
+        db.query(TableSession).filter(
+            TableSession.table_id == db_table.id,
+            TableSession.cleared_at.is_(None),
+        ).update({TableSession.party_size: party_size}, synchronize_session=False)
+        db_table.party_size = party_size
+
+
+def open_session_ids(db: Session, table_ids: Iterable[int]) -> Dict[int, int]:
+    """masa id -> açık oturum id; siparişleri oturuma bağlamak için."""
+    table_ids = {table_id for table_id in table_ids if table_id is not None}
+    if not table_ids:
+        return {}
+    return dict(db.execute(
+        select(TableSession.table_id, func.max(TableSession.id))
+        .where(TableSession.table_id.in_(table_ids), TableSession.cleared_at.is_(None))
+        .group_by(TableSession.table_id)
+    ).all())
+
+
+class FloorState:
+    """Masaların bellekteki durumu; durum ve kapasiteye göre indekslenir.
+
+    KitchenQueue gibi table_feed olaylarını uygular. Masa tablosu yalnızca ilk
+    okumada, olay akışında boşluk oluştuğunda ya da başka bir worker masaları
+    değiştirdiğinde sorgulanır.
+    """
+
+    def __init__(self, feed: EventFeed = table_feed):
+        self._feed = feed
+        self._tables: Dict[int, Table] = {}
+        # durum -> kapasite -> masa id'leri; kapasiteler ayrıca sıralı tutulur
+        self._by_status: Dict[TableStatus, Dict[int, Set[int]]] = {status: {} for status in TableStatus}
+        self._capacities: Dict[TableStatus, List[int]] = {status: [] for status in TableStatus}
+        self._cursor: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _index(self, table: Table) -> None:
+        buckets = self._by_status[table.status]
+        bucket = buckets.get(table.capacity)
+        if bucket is None:
+            bucket = buckets[table.capacity] = set()
+            insort(self._capacities[table.status], table.capacity)
+        bucket.add(table.id)
+
+    def _unindex(self, table: Table) -> None:
+        buckets = self._by_status[table.status]
+        bucket = buckets[table.capacity]
+        bucket.discard(table.id)
+        if not bucket:
+            del buckets[table.capacity]
+            self._capacities[table.status].remove(table.capacity)
+
+    def _apply(self, table: Table) -> None:
+        previous = self._tables.get(table.id)
+        if previous is not None:
+            self._unindex(previous)
+        self._tables[table.id] = table
+        self._index(table)
+
+    def _drop(self, table_id: int) -> None:
+        previous = self._tables.pop(table_id, None)
+        if previous is not None:
+            self._unindex(previous)
+
+    def catch_up(self) -> bool:
+        """Yeni olayları uygular; veritabanından yeniden yükleme gerekiyorsa False döner."""
+        with self._lock:
+            if self._cursor is None:
+                return False
+            events = self._feed.since(self._cursor)
+            if events is None:
+                return False
+            for event in events:
+                if event["type"] == RESET_EVENT:
+                    # Başka bir worker yazdı; değişiklik veritabanından okunur
+                    self._cursor = None
+                    return False
+                if event["type"] == "table_deleted":
+                    self._drop(event["data"]["id"])
+                elif event["type"] in ("table_created", "table_updated", "table_status_changed"):
+                    self._apply(Table.model_validate(event["data"]))
+                self._cursor = event["id"]
+            return True
+
+    def reload(self, db: Session) -> None:
+        # İmleç sorgudan önce alınır; arada gelen olaylar sonraki catch_up ile uygulanır
+        cursor = self._feed.cursor
+        tables = [Table.model_validate(table) for table in db.query(TableModel).all()]
+        with self._lock:
+            self._tables = {}
+            self._by_status = {status: {} for status in TableStatus}
+            self._capacities = {status: [] for status in TableStatus}
+            for table in tables:
+                self._apply(table)
+            self._cursor = cursor
+
+    def reset(self, key: Optional[str] = None) -> None:
+        # Sonraki okumada veritabanından yeniden yüklenir
+        with self._lock:
+            self._cursor = None
+
+    def free_tables(self, min_capacity: int = 1, limit: int = 10) -> List[Table]:
+        """En az min_capacity kişilik boş masalar, en küçük uygun masa önce."""
+        with self._lock:
+            capacities = self._capacities[TableStatus.AVAILABLE]
+            buckets = self._by_status[TableStatus.AVAILABLE]
+            tables: List[Table] = []
+            for capacity in capacities[bisect_left(capacities, min_capacity):]:
+                tables.extend(sorted((self._tables[table_id] for table_id in buckets[capacity]), key=lambda table: table.number))
+                if len(tables) >= limit:
+                    break
+        return tables[:limit]
+
+    def tables(self) -> List[Table]:
+        with self._lock:
+            return sorted(self._tables.values(), key=lambda table: table.number)
+
+
+floor_state = FloorState()
+
+
+async def get_floor_state(db: AsyncDB) -> FloorState:
+    if not floor_state.catch_up():
+        await db.run_sync(floor_state.reload)
+    return floor_state
+
+
+# (masa verisi sürümü, gün) -> {masa id: (oturum sayısı, ortalama saniye)}
+_turn_time_cache = TTLCache(maxsize=32, ttl=TURN_TIME_CACHE_SECONDS)
+
+
+def load_turn_times(db: Session, since: Optional[datetime] = None) -> Dict[int, Tuple[int, float]]:
+    stmt = (
+        select(TableSession.table_id, func.count(), func.avg(TableSession.turn_seconds))
+        .where(TableSession.cleared_at.isnot(None))
+        .group_by(TableSession.table_id)
+    )
+    if since is not None:
+        stmt = stmt.where(TableSession.cleared_at >= since)
+    return {table_id: (count, average) for table_id, count, average in db.execute(stmt)}
+
+
+async def get_turn_times(db: AsyncDB, days: Optional[int] = None) -> List[TableTurnTime]:
+    key = (data_versions.get("tables"), days)
+    stats = _turn_time_cache.get(key)
+    if stats is None:
+        since = _utcnow() - timedelta(days=days) if days else None
+        stats = await db.run_sync(load_turn_times, since)
+        _turn_time_cache.set(key, stats)
+
+    floor = await get_floor_state(db)
+    now = _utcnow()
+    turn_times = []
+    for table in floor.tables():
+        sessions, average = stats.get(table.id, (0, None))
+        occupied = table.status == TableStatus.OCCUPIED and table.seated_at is not None
+        turn_times.append(TableTurnTime(
+            table_id=table.id,
+            number=table.number,
+            sessions=sessions,
+            average_turn_minutes=round(average / 60, 1) if average is not None else None,
+            occupied_minutes=round(_seconds_between(table.seated_at, now) / 60, 1) if occupied else None,
+        ))
+    return turn_times
@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import AsyncDB
+from models import IdempotencyRecord
+
+# Tekrar gönderilen isteklerin ilk yanıtı bu süre boyunca saklanır
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 60 * 60)))
+# Bu süreden uzun süren "devam ediyor" kaydı, çöken bir worker'dan kalmış sayılır ve devralınır
+IDEMPOTENCY_PENDING_SECONDS = float(os.getenv("IDEMPOTENCY_PENDING_SECONDS", "60"))
+# Başka bir isteğin sonucunu beklerken tablonun yoklanma aralığı
+IDEMPOTENCY_POLL_SECONDS = float(os.getenv("IDEMPOTENCY_POLL_SECONDS", "0.05"))
+# Süresi dolan kayıtlar en fazla bu aralıkla silinir
+IDEMPOTENCY_PRUNE_SECONDS = float(os.getenv("IDEMPOTENCY_PRUNE_SECONDS", "300"))
+MAX_KEY_LENGTH = 255
+
+# İşlemin commit'inden önce sonucu anahtar kaydına yazan fonksiyon
+Completion = Callable[[Session, Any], None]
+
+_last_prune = {"at": 0.0}
+_prune_lock = threading.Lock()
+
+
+def _fingerprint(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _age_seconds(created_at: datetime, now: datetime) -> float:
+    # SQLite zaman damgaları UTC ve saat dilimsiz döner
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return (now - created_at).total_seconds()
+
+
+def _prune(db: Session, now: datetime) -> None:
+    with _prune_lock:
+        if time.monotonic() - _last_prune["at"] < IDEMPOTENCY_PRUNE_SECONDS:
+            return
+        _last_prune["at"] = time.monotonic()
+    db.query(IdempotencyRecord).filter(
+        IdempotencyRecord.created_at < now - timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+def _find(db: Session, user_id: int, scope: str, key: str) -> Optional[IdempotencyRecord]:
+    # Yoklamalarda oturumdaki eski kopya yerine güncel satır okunur
+    return db.query(IdempotencyRecord).execution_options(populate_existing=True).filter(
+        IdempotencyRecord.user_id == user_id,
+        IdempotencyRecord.scope == scope,
+        IdempotencyRecord.key == key,
+    ).first()
+
+
+def claim_key(db: Session, user_id: int, scope: str, key: str, fingerprint: str) -> Optional[Tuple[str, Optional[str]]]:
+    """Anahtarı bu istek için ayırır ve None döner.
+
+    Anahtar başka bir istekte kullanılmışsa o kaydın (parmak izi, yanıt) bilgisini
+    döner; yanıt None ise ilk istek hâlâ sürüyor demektir.
+    """
+    now = _utcnow()
+    _prune(db, now)
+    while True:
+        db.add(IdempotencyRecord(user_id=user_id, scope=scope, key=key, fingerprint=fingerprint, created_at=now))
+        try:
+            db.commit()
+            return None
+        except IntegrityError:
+            db.rollback()
+        record = _find(db, user_id, scope, key)
+        if record is None:
+            # İlk istek başarısız olup kaydı sildi; tekrar dene
+            continue
+        age = _age_seconds(record.created_at, now)
+        expired = age >= IDEMPOTENCY_TTL_SECONDS
+        abandoned = record.response is None and age >= IDEMPOTENCY_PENDING_SECONDS
+        if expired or abandoned:
+            db.delete(record)
+            db.commit()
+            continue
+        return record.fingerprint, record.response
+
+
+def read_key(db: Session, user_id: int, scope: str, key: str) -> Optional[Tuple[str, Optional[str]]]:
+    record = _find(db, user_id, scope, key)
+    if record is None:
+        return None
+    return record.fingerprint, record.response
+
+
+def complete_key(db: Session, user_id: int, scope: str, key: str, result: Any) -> None:
+    """İşlemin yanıtını anahtar kaydına yazar.
+
+    Commit çağırana bırakılır; yanıt işlemin kendi değişiklikleriyle aynı
+    işlemde yazılır, sipariş kaydedilip yanıtı kaydedilmemiş bir anahtar kalmaz.
+    """
+    db.query(IdempotencyRecord).filter(
+        IdempotencyRecord.user_id == user_id,
+        IdempotencyRecord.scope == scope,
+        IdempotencyRecord.key == key,
+    ).update({IdempotencyRecord.response: json.dumps(jsonable_encoder(result))}, synchronize_session=False)
+
+
+def release_key(db: Session, user_id: int, scope: str, key: str) -> None:
+    # İşlem hata ile bitti; yarım kalan değişiklikler geri alınır, anahtar yeniden denenebilir
+    db.rollback()
+    db.query(IdempotencyRecord).filter(
+        IdempotencyRecord.user_id == user_id,
+        IdempotencyRecord.scope == scope,
+        IdempotencyRecord.key == key,
+        IdempotencyRecord.response.is_(None),
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
+async def run_idempotent(
+    response: Response,
+    db: AsyncDB,
+    idempotency_key: Optional[str],
+    user_id: int,
+    scope: str,
+    payload: Any,
+    operation: Callable[[Optional[Completion]], Awaitable[Any]],
+) -> Any:
+    """Aynı Idempotency-Key ile gelen isteklerde işlemi tekrar çalıştırmadan ilk sonucu döner.
+
+    Anahtar kullanıcıya ve endpoint'e (scope) bağlıdır ve veritabanında tutulur;
+    farklı worker'lara ya da yeniden başlatmadan sonra gelen tekrarlar da ilk
+    yanıtı alır. payload aynı anahtarın farklı bir istekle kullanılmasını
+    yakalamak için parmak izine dönüştürülür. Hata ile biten istekler saklanmaz,
+    aynı anahtarla yeniden denenebilir.
+
+    operation'a bir tamamlama fonksiyonu verilir (anahtar yoksa None); işlem
+    commit etmeden önce bunu kendi oturumu ve sonucuyla çağırmalıdır.
+    """
+    if idempotency_key is None:
+        return await operation(None)
+    if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
+
+    fingerprint = _fingerprint(payload)
+    while True:
+        existing = await db.run_sync(claim_key, user_id, scope, idempotency_key, fingerprint)
+        if existing is None:
+            break
+        # Aynı anahtarlı ilk istek hâlâ sürüyorsa sonucunu bekle
+        deadline = time.monotonic() + IDEMPOTENCY_PENDING_SECONDS
+        while existing is not None and existing[0] == fingerprint and existing[1] is None:
+            if time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(IDEMPOTENCY_POLL_SECONDS)
+            existing = await db.run_sync(read_key, user_id, scope, idempotency_key)
+        if existing is None or (existing[0] == fingerprint and existing[1] is None):
+            # İlk istek başarısız oldu ya da yarıda kaldı; bu istek anahtarı yeniden almayı dener
+            continue
+        if existing[0] != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        response.headers["Idempotent-Replayed"] = "true"
+        return json.loads(existing[1])
+
+    def complete(session: Session, result: Any) -> None:
+        complete_key(session, user_id, scope, idempotency_key, result)
+
+    try:
+        return await operation(complete)
+    except BaseException:
+        await db.run_sync(release_key, user_id, scope, idempotency_key)
+        raise
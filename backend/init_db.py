@@ -1,4 +1,4 @@
-from database import engine, SessionLocal
+from database import engine, SessionLocal, upgrade_schema
 import models
 from schemas import UserRole
 from auth import get_password_hash
@@ -12,6 +12,7 @@ def init_db():
     try:
         # Veritabanı tablolarını oluştur
         models.Base.metadata.create_all(bind=engine)
+        upgrade_schema(models.Base.metadata)
         logger.info("Veritabanı tabloları oluşturuldu!")
         
         # İlk admin kullanıcısını oluştur
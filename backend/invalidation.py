@@ -0,0 +1,158 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import closing
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# local: tek worker; sqlite: aynı makinedeki worker'lar ortak bir SQLite dosyası üzerinden haberleşir
+CACHE_BUS = os.getenv("CACHE_BUS", "local")
+CACHE_BUS_PATH = os.getenv("CACHE_BUS_PATH", "./cache_bus.db")
+CACHE_BUS_POLL_SECONDS = float(os.getenv("CACHE_BUS_POLL_SECONDS", "0.5"))
+# Bu süreden eski bildirimler tablodan silinir
+CACHE_BUS_RETENTION_SECONDS = float(os.getenv("CACHE_BUS_RETENTION_SECONDS", "600"))
+
+Handler = Callable[[Optional[str]], None]
+
+
+class InvalidationBus:
+    """Önbellek geçersiz kılma bildirimleri için yayın/abone arayüzü.
+
+    publish() kendi süreçteki abonelere hemen iletilir; çok worker'lı
+    sürümler bildirimi diğer worker'lara da taşır.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Tuple[Handler, bool]]] = defaultdict(list)
+
+    def subscribe(self, channel: str, handler: Handler, include_local: bool = True) -> None:
+        # include_local=False: yerel yazmalar zaten başka yoldan yansıtılıyorsa yalnızca diğer worker'lar
+        self._handlers[channel].append((handler, include_local))
+
+    def publish(self, channel: str, key: Optional[str] = None) -> None:
+        self._dispatch(channel, key, remote=False)
+
+    def _dispatch(self, channel: str, key: Optional[str], remote: bool) -> None:
+        for handler, include_local in self._handlers.get(channel, []):
+            if not remote and not include_local:
+                continue
+            try:
+                handler(key)
+            except Exception:
+                logger.exception("Cache invalidation handler failed for %s", channel)
+
+
+class LocalInvalidationBus(InvalidationBus):
+    pass
+
+
+class SQLiteInvalidationBus(InvalidationBus):
+    """Bildirimleri ortak bir SQLite tablosuna yazar, diğer worker'lar tabloyu yoklar.
+
+    publish() DB_ASYNC modunda event loop üzerinde de çağrıldığı için tabloya
+    kendisi yazmaz; bildirimler kuyruğa alınır ve ayrı bir thread toplu yazar.
+    """
+
+    def __init__(self, path: str, poll_seconds: float = CACHE_BUS_POLL_SECONDS):
+        super().__init__()
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.origin = uuid.uuid4().hex
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_invalidations ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, key TEXT, "
+                "origin TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM cache_invalidations").fetchone()[0]
+        self._pending: "queue.Queue[Tuple[str, Optional[str], str, float]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_forever, name="cache-bus-writer", daemon=True)
+        self._writer.start()
+        self._thread = threading.Thread(target=self._poll_forever, name="cache-bus", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def publish(self, channel: str, key: Optional[str] = None) -> None:
+        super().publish(channel, key)
+        self._pending.put((channel, key, self.origin, time.time()))
+
+    def flush(self) -> None:
+        # Kuyruktaki bildirimler yazılana kadar bekler (testler ve kapanış için)
+        self._pending.join()
+
+    def _write(self, rows: List[Tuple[str, Optional[str], str, float]]) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO cache_invalidations (channel, key, origin, created_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+
+    def _write_forever(self) -> None:
+        while True:
+            rows = [self._pending.get()]
+            # Aynı anda biriken bildirimler tek bağlantıda yazılır
+            while True:
+                try:
+                    rows.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(rows)
+            except sqlite3.Error:
+                logger.exception("Cache invalidation publish failed")
+            finally:
+                for _ in rows:
+                    self._pending.task_done()
+
+    def poll(self) -> int:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT id, channel, key, origin FROM cache_invalidations WHERE id > ? ORDER BY id",
+                (self._last_id,),
+            ).fetchall()
+        for row_id, channel, key, origin in rows:
+            self._last_id = row_id
+            if origin != self.origin:
+                self._dispatch(channel, key, remote=True)
+        return len(rows)
+
+    def prune(self) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "DELETE FROM cache_invalidations WHERE created_at < ?",
+                (time.time() - CACHE_BUS_RETENTION_SECONDS,),
+            )
+
+    def _poll_forever(self) -> None:
+        last_prune = time.monotonic()
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                self.poll()
+                if time.monotonic() - last_prune >= CACHE_BUS_RETENTION_SECONDS:
+                    self.prune()
+                    last_prune = time.monotonic()
+            except sqlite3.Error:
+                logger.exception("Cache invalidation poll failed")
+
+
+def create_invalidation_bus(kind: str = CACHE_BUS) -> InvalidationBus:
+    if kind == "sqlite":
+        return SQLiteInvalidationBus(CACHE_BUS_PATH)
+    if kind != "local":
+        raise ValueError(f"Unknown CACHE_BUS: {kind}")
+    return LocalInvalidationBus()
+
+
+invalidation_bus = create_invalidation_bus()
@@ -0,0 +1,158 @@
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session, selectinload
+
+from database import AsyncDB
+from events import RESET_EVENT, EventFeed, order_feed
+from menu_cache import menu_cache
+from models import Order as OrderModel
+from schemas import (
+    Category,
+    KitchenQueue as KitchenQueueSchema,
+    KitchenStation,
+    KitchenTicket,
+    KitchenTicketItem,
+    MenuItem,
+    Order,
+    OrderStatus,
+)
+
+# Bu süreden uzun bekleyen siparişler kuyruğun başına alınır
+KITCHEN_LATE_MINUTES = int(os.getenv("KITCHEN_LATE_MINUTES", "20"))
+
+ACTIVE_STATUSES = (OrderStatus.PENDING, OrderStatus.PREPARING)
+
+# Öncelik sırası: gecikenler, hazırlanmakta olanlar, bekleyenler
+_PRIORITY_RANK = {"late": 0, "preparing": 1, "pending": 2}
+
+
+class KitchenQueue:
+    """Aktif siparişlerin bellekteki izdüşümü.
+
+    Sipariş tablosu yalnızca ilk okumada, olay akışında boşluk oluştuğunda ya da
+    başka bir worker sipariş yazdığında (reset olayı) sorgulanır; sonraki okumalar
+    order_feed olaylarını uygulayarak güncellenir.
+    """
+
+    def __init__(self, feed: EventFeed = order_feed):
+        self._feed = feed
+        self._orders: Dict[int, Order] = {}
+        self._cursor: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def cursor(self) -> Optional[int]:
+        return self._cursor
+
+    def catch_up(self) -> bool:
+        """Yeni olayları uygular; veritabanından yeniden yükleme gerekiyorsa False döner."""
+        with self._lock:
+            if self._cursor is None:
+                return False
+            events = self._feed.since(self._cursor)
+            if events is None:
+                return False
+            for event in events:
+                if event["type"] == RESET_EVENT:
+                    # Başka bir worker yazdı; değişiklik veritabanından okunur
+                    self._cursor = None
+                    return False
+                if event["type"] in ("order_created", "order_status_changed"):
+                    self._apply(Order.model_validate(event["data"]))
+                self._cursor = event["id"]
+            return True
+
+    def _apply(self, order: Order) -> None:
+        if order.status in ACTIVE_STATUSES:
+            self._orders[order.id] = order
+        else:
+            self._orders.pop(order.id, None)
+
+    def reload(self, db: Session) -> None:
+        # İmleç sorgudan önce alınır; arada gelen olaylar sonraki catch_up ile uygulanır
+        cursor = self._feed.cursor
+        orders = db.query(OrderModel).options(selectinload(OrderModel.items)).filter(
+            OrderModel.status.in_(ACTIVE_STATUSES)
+        ).all()
+        with self._lock:
+            self._orders = {order.id: Order.model_validate(order) for order in orders}
+            self._cursor = cursor
+
+    def reset(self, key: Optional[str] = None) -> None:
+        # Sonraki okumada veritabanından yeniden yüklenir
+        with self._lock:
+            self._cursor = None
+
+    def build(self, menu_items: Dict[int, MenuItem], now: Optional[datetime] = None) -> KitchenQueueSchema:
+        with self._lock:
+            orders = list(self._orders.values())
+            cursor = self._cursor or 0
+
+        stations: Dict[Optional[Category], List[KitchenTicket]] = {}
+        for order in orders:
+            age_seconds = _age_seconds(order.created_at, now)
+            if age_seconds >= KITCHEN_LATE_MINUTES * 60:
+                priority = "late"
+            else:
+                priority = order.status.value
+            # Sipariş her istasyon için yalnızca o istasyonun kalemlerini içeren bir fişe bölünür
+            items_by_station: Dict[Optional[Category], List[KitchenTicketItem]] = {}
+            for item in order.items:
+                menu_item = menu_items.get(item.menu_item_id)
+                category = menu_item.category if menu_item else None
+                items_by_station.setdefault(category, []).append(KitchenTicketItem(
+                    menu_item_id=item.menu_item_id,
+                    name=menu_item.name if menu_item else f"#{item.menu_item_id}",
+                    quantity=item.quantity,
+                ))
+            for category, items in items_by_station.items():
+                stations.setdefault(category, []).append(KitchenTicket(
+                    order_id=order.id,
+                    table_id=order.table_id,
+                    status=order.status,
+                    created_at=order.created_at,
+                    age_seconds=age_seconds,
+                    priority=priority,
+                    items=items,
+                ))
+
+        station_order = list(Category) + [None]
+        return KitchenQueueSchema(
+            cursor=cursor,
+            active_orders=len(orders),
+            stations=[
+                KitchenStation(
+                    category=category,
+                    tickets=sorted(
+                        stations[category],
+                        key=lambda ticket: (_PRIORITY_RANK[ticket.priority], -ticket.age_seconds, ticket.order_id),
+                    ),
+                )
+                for category in station_order
+                if category in stations
+            ],
+        )
+
+
+def _age_seconds(created_at: Optional[datetime], now: Optional[datetime]) -> int:
+    if created_at is None:
+        return 0
+    if now is None:
+        # SQLite zaman damgaları UTC ve saat dilimsiz döner
+        now = datetime.now(timezone.utc) if created_at.tzinfo else datetime.utcnow()
+    return max(int((now - created_at).total_seconds()), 0)
+
+
+kitchen_queue = KitchenQueue()
+
+
+async def get_kitchen_queue(db: AsyncDB) -> KitchenQueueSchema:
+    if not kitchen_queue.catch_up():
+        await db.run_sync(kitchen_queue.reload)
+    menu_items = menu_cache.peek_items()
+    if menu_items is None:
+        menu_items = await db.run_sync(menu_cache.items)
+    return kitchen_queue.build(menu_items)
@@ -1,24 +1,49 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, Header, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from datetime import timedelta
-from typing import List
+from typing import List, Optional
+import logging
 
-from database import engine, get_db
-from models import Base, User, MenuItem, Order, Table
-from routes import auth, users, menu, orders, tables
+from database import AsyncDB, SessionLocal, engine, get_async_db, upgrade_schema, db_pool_stats
+from models import Base, User
+from routes import auth, users, menu, orders, tables, reports
+from compression import CompressionMiddleware
+from menu_cache import menu_response
+from serialization import json_response
+from metrics import MetricsMiddleware, instrument_database, metrics_response, metrics_token_matches
+from qr_codes import render_missing_qr_codes
 import schemas
 from schemas import Category, UserRole
 from auth import (
-    verify_password,
+    verify_password_async,
+    get_password_hash_async,
+    get_user_by_email,
     create_access_token,
+    user_token_data,
+    load_token_revocations,
     get_current_active_user,
+    get_token_claims,
+    decode_token_claims,
+    optional_oauth2_scheme,
     ACCESS_TOKEN_EXPIRE_MINUTES,
 )
 
 # Veritabanı tablolarını oluştur
 Base.metadata.create_all(bind=engine)
+upgrade_schema(Base.metadata)
+
+# Token iptal listesi açılışta yüklenir, sonra kullanıcı değişiklikleriyle güncellenir.
+# QR kodu olmayan eski masaların kodları da burada üretilir; QR endpoint'i kod üretmez.
+with SessionLocal() as _db:
+    load_token_revocations(_db)
+    render_missing_qr_codes(_db)
+
+logger = logging.getLogger(__name__)
+
+# İstek süreleri ve SQL sorguları /metrics üzerinden izlenir
+instrument_database()
 
 app = FastAPI()
 
@@ -29,7 +54,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Farklı origin'deki frontend'in okuyabileceği yanıt başlıkları
+    expose_headers=["X-Feed-Cursor", "X-Next-Cursor", "ETag"],
 )
+# Büyük yanıtlar istemcinin desteklediği kodlamayla (br/gzip) sıkıştırılır
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 # Router'ları ekle
 app.include_router(auth.router)
@@ -37,14 +67,15 @@ app.include_router(users.router)
 app.include_router(menu.router)
 app.include_router(orders.router)
 app.include_router(tables.router)
+app.include_router(reports.router)
 
 @app.post("/token", response_model=schemas.Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await db.run_sync(get_user_by_email, form_data.username)
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Geçersiz e-posta veya şifre",
@@ -52,17 +83,14 @@ async def login_for_access_token(
         )
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=user_token_data(user), expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.post("/users/", response_model=schemas.UserResponse)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
+def register_user(db: Session, user: schemas.UserCreate, hashed_password: str) -> User:
+    db_user = get_user_by_email(db, user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="E-posta adresi zaten kayıtlı")
-    from auth import get_password_hash
-    hashed_password = get_password_hash(user.password)
     db_user = User(
         email=user.email,
         hashed_password=hashed_password,
@@ -74,9 +102,14 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db.refresh(db_user)
     return db_user
 
+@app.post("/users/", response_model=schemas.UserResponse)
+async def create_user(user: schemas.UserCreate, db: AsyncDB = Depends(get_async_db)):
+    hashed_password = await get_password_hash_async(user.password)
+    return await db.run_sync(register_user, user, hashed_password)
+
 @app.get("/users/me", response_model=schemas.UserResponse)
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
-    print("Current user:", current_user.__dict__)  # Debug için
+    logger.debug("Current user: %s", current_user.email)
     response = schemas.UserResponse(
         id=current_user.id,
         email=current_user.email,
@@ -84,89 +117,76 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
         role=current_user.role,
         is_active=current_user.is_active
     )
-    print("Response:", response.dict())  # Debug için
     return response
 
 @app.get("/")
 def read_root():
     return {"message": "Restaurant System API"}
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request, token: Optional[str] = Depends(optional_oauth2_scheme)):
+    # Route adları, gecikmeler ve havuz durumu herkese açık değildir
+    if not metrics_token_matches(request):
+        if token is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Geçersiz kimlik bilgileri",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if decode_token_claims(token).role != UserRole.ADMIN:
+            raise HTTPException(status_code=403, detail="Bu işlem için yetkiniz yok")
+    return metrics_response()
+
+@app.get("/stats/db")
+async def get_db_stats(current_user: schemas.TokenClaims = Depends(get_token_claims)):
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Bu işlem için yetkiniz yok")
+    return db_pool_stats()
+
 # Menü öğeleri için endpoint'ler
 @app.get("/menu/", response_model=List[schemas.MenuItem])
-def get_menu_items(
+async def get_menu_items(
+    request: Request,
     category: Category = None,
-    db: Session = Depends(get_db)
+    db: AsyncDB = Depends(get_async_db)
 ):
-    query = db.query(MenuItem)
-    if category:
-        query = query.filter(MenuItem.category == category)
-    return query.all()
+    return await menu_response(request, db, category)
 
 @app.post("/menu/", response_model=schemas.MenuItem)
-def create_menu_item(
+async def create_menu_item(
     item: schemas.MenuItemCreate,
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Bu işlem için yetkiniz yok")
-    db_item = MenuItem(**item.dict())
-    db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
-    return db_item
+    return await db.run_sync(menu.add_menu_item, item)
 
 # Masalar için endpoint'ler
 @app.get("/tables/", response_model=List[schemas.Table])
-def get_tables(db: Session = Depends(get_db)):
-    return db.query(Table).all()
+async def get_tables(db: AsyncDB = Depends(get_async_db)):
+    return json_response((await tables.get_table_snapshot(db))["body"])
 
 @app.post("/tables/", response_model=schemas.Table)
-def create_table(
+async def create_table(
     table: schemas.TableCreate,
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(status_code=403, detail="Bu işlem için yetkiniz yok")
-    db_table = Table(**table.dict())
-    db.add(db_table)
-    db.commit()
-    db.refresh(db_table)
-    return db_table
+    return await db.run_sync(tables.add_table, table)
 
 # Siparişler için endpoint'ler
-@app.get("/orders/", response_model=List[schemas.Order])
-def get_orders(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    return db.query(Order).all()
+# Eski yol; filtre, sayfa sınırı ve imleç için /orders ile aynı işleyiciyi kullanır
+app.get("/orders/", response_model=List[schemas.Order])(orders.get_orders)
 
 @app.post("/orders/", response_model=schemas.Order)
-def create_order(
+async def create_order(
     order: schemas.OrderCreate,
-    db: Session = Depends(get_db),
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncDB = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    db_order = Order(
-        user_id=current_user.id,
-        status=order.status,
-        total_amount=order.total_amount
-    )
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
-    
-    for item in order.items:
-        db_item = OrderItem(
-            order_id=db_order.id,
-            menu_item_id=item.menu_item_id,
-            quantity=item.quantity,
-            price_at_time=item.price_at_time
-        )
-        db.add(db_item)
-    
-    db.commit()
-    db.refresh(db_order)
-    return db_order 
\ No newline at end of file
+    return (await orders.create_orders_idempotent(response, idempotency_key, [order], db, current_user.id))[0]
\ No newline at end of file
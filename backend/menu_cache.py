@@ -0,0 +1,80 @@
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+
+from database import AsyncDB
+from etags import cache_headers, etag_matches, not_modified_response
+from invalidation import invalidation_bus
+from models import MenuItem as MenuItemModel
+from schemas import Category, MenuItem
+from serialization import dump_json, json_response, menu_item_list_adapter
+
+
+class MenuCache:
+    """Kategori başına serileştirilmiş menü; menü yazıldığında sürüm artar."""
+
+    def __init__(self):
+        self.version = 1
+        self._snapshots: Dict[Optional[Category], Tuple[bytes, str]] = {}
+        self._items: Optional[Dict[int, MenuItem]] = None
+        self._lock = threading.Lock()
+
+    def peek(self, category: Optional[Category] = None) -> Optional[Tuple[bytes, str]]:
+        return self._snapshots.get(category)
+
+    def get(self, db: Session, category: Optional[Category] = None) -> Tuple[bytes, str]:
+        snapshot = self._snapshots.get(category)
+        if snapshot is not None:
+            return snapshot
+        version = self.version
+        query = db.query(MenuItemModel)
+        if category:
+            query = query.filter(MenuItemModel.category == category)
+        body = dump_json(menu_item_list_adapter, query.all())
+        # Özet sürüm başına bir kez hesaplanır; zayıf etiket sıkıştırılmış gövdeler için de geçerli
+        snapshot = (body, f'W/"{hashlib.sha256(body).hexdigest()}"')
+        with self._lock:
+            if self.version == version:
+                self._snapshots[category] = snapshot
+        return snapshot
+
+    def peek_items(self) -> Optional[Dict[int, MenuItem]]:
+        return self._items
+
+    def items(self, db: Session) -> Dict[int, MenuItem]:
+        # id -> menü öğesi; mutfak ekranı gibi isim/kategori eşlemesi gereken yerler için
+        items = self._items
+        if items is not None:
+            return items
+        version = self.version
+        items = {item.id: MenuItem.model_validate(item) for item in db.query(MenuItemModel).all()}
+        with self._lock:
+            if self.version == version:
+                self._items = items
+        return items
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._snapshots.clear()
+            self._items = None
+
+
+menu_cache = MenuCache()
+
+# Menü yazmaları invalidation_bus.publish("menu") ile tüm worker'lardaki önbelleği düşürür
+invalidation_bus.subscribe("menu", lambda key: menu_cache.invalidate())
+
+
+async def menu_response(request: Request, db: AsyncDB, category: Optional[Category] = None) -> Response:
+    snapshot = menu_cache.peek(category)
+    if snapshot is None:
+        snapshot = await db.run_sync(menu_cache.get, category)
+    body, etag = snapshot
+    headers = {"X-Menu-Version": str(menu_cache.version)}
+    if etag_matches(request, etag):
+        return not_modified_response(etag, headers)
+    return json_response(body, cache_headers(etag, headers))
@@ -0,0 +1,243 @@
+import logging
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from database import AsyncDB
+from invalidation import invalidation_bus
+from menu_cache import menu_cache
+from models import MenuItem as MenuItemModel
+from schemas import Category, MenuItem
+
+logger = logging.getLogger(__name__)
+
+# Bu uzunluktan sonraki harfler önek aramasında dikkate alınmaz
+MAX_PREFIX = 12
+# Yazım hatası toleransı bu uzunluktaki terimlerden itibaren uygulanır (en fazla 1 hata)
+FUZZY_MIN_LENGTH = 3
+MAX_QUERY_TERMS = 5
+# Eşitleme sırasında menü değişirse kaç kez yeniden deneneceği; sonra SQL ile aranır
+SYNC_ATTEMPTS = 3
+
+# İsimdeki eşleşmeler açıklamadakilerden önce gelir
+NAME_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+# Eşleşme türüne göre çarpan: tam kelime > önek > yazım hatalı önek
+EXACT_SCORE, PREFIX_SCORE, FUZZY_SCORE = 3, 2, 1
+
+_TURKISH_FOLD = str.maketrans("çğıöşüÇĞİIÖŞÜ", "cgiosuCGIIOSU")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Küçük harfe çevirir, Türkçe karakterleri ve aksanları sadeleştirip kelimelere böler."""
+    text = unicodedata.normalize("NFKD", text.translate(_TURKISH_FOLD).lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _WORD.findall(text)
+
+
+def _deletions(term: str) -> Set[str]:
+    return {term[:index] + term[index + 1:] for index in range(len(term))}
+
+
+class MenuSearchIndex:
+    """Menü öğelerinin isim ve açıklamaları üzerinde önek ve yazım hatası toleranslı arama.
+
+    Her kelimenin önekleri ve öneklerin tek harf silinmiş biçimleri (SymSpell
+    yaklaşımı) sözlüklerde tutulur; arama sözlük okumalarıyla yapılır, menü
+    taranmaz. Yerel yazmalar öğeyi yerinde günceller, diğer worker'ların
+    yazmalarından sonra ilk aramada menü önbelleğiyle farkı alınır.
+    """
+
+    def __init__(self):
+        self._items: Dict[int, MenuItem] = {}
+        # anahtar -> {öğe id: ağırlık}
+        self._words: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._prefixes: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._fuzzy: Dict[str, Dict[int, int]] = defaultdict(dict)
+        # Öğenin eklediği anahtarlar; silme ve güncellemede temizlenir
+        self._keys: Dict[int, List[Tuple[Dict[str, Dict[int, int]], str]]] = {}
+        self._loaded = False
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def _add(self, item: MenuItem) -> None:
+        keys = []
+
+        def put(index: Dict[str, Dict[int, int]], key: str, weight: int) -> None:
+            postings = index[key]
+            if postings.get(item.id, 0) < weight:
+                postings[item.id] = weight
+            keys.append((index, key))
+
+        for text, weight in ((item.name, NAME_WEIGHT), (item.description, DESCRIPTION_WEIGHT)):
+            for word in tokenize(text):
+                put(self._words, word, weight)
+                for length in range(1, min(len(word), MAX_PREFIX) + 1):
+                    prefix = word[:length]
+                    put(self._prefixes, prefix, weight)
+                    if length >= FUZZY_MIN_LENGTH:
+                        for deleted in _deletions(prefix):
+                            put(self._fuzzy, deleted, weight)
+        self._items[item.id] = item
+        self._keys[item.id] = keys
+
+    def _remove(self, item_id: int) -> None:
+        self._items.pop(item_id, None)
+        for index, key in self._keys.pop(item_id, []):
+            postings = index.get(key)
+            if postings is None:
+                continue
+            postings.pop(item_id, None)
+            if not postings:
+                del index[key]
+
+    def upsert(self, item: MenuItem) -> None:
+        with self._lock:
+            self._generation += 1
+            if self._loaded:
+                self._remove(item.id)
+                self._add(item)
+
+    def remove(self, item_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            if self._loaded:
+                self._remove(item_id)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        # Başka bir worker menüyü değiştirdi; sonraki aramada menü önbelleğiyle eşitlenir
+        with self._lock:
+            self._generation += 1
+            self._loaded = False
+
+    def sync(self, items: Dict[int, MenuItem], generation: int) -> None:
+        """Yalnızca değişen, eklenen ve silinen öğeleri yeniden indeksler."""
+        with self._lock:
+            if generation != self._generation:
+                # Öğeler okunurken menü yeniden değişti; sonraki arama tekrar dener
+                return
+            for item_id in [item_id for item_id in self._items if item_id not in items]:
+                self._remove(item_id)
+            for item_id, item in items.items():
+                if self._items.get(item_id) != item:
+                    self._remove(item_id)
+                    self._add(item)
+            self._loaded = True
+
+    def _match_term(self, term: str) -> Dict[int, int]:
+        scores: Dict[int, int] = {}
+
+        def collect(postings: Optional[Dict[int, int]], multiplier: int) -> None:
+            for item_id, weight in (postings or {}).items():
+                score = weight * multiplier
+                if scores.get(item_id, 0) < score:
+                    scores[item_id] = score
+
+        collect(self._words.get(term), EXACT_SCORE)
+        prefix = term[:MAX_PREFIX]
+        collect(self._prefixes.get(prefix), PREFIX_SCORE)
+        if len(prefix) >= FUZZY_MIN_LENGTH:
+            # Eksik harf: terim, indeksteki bir önekin tek harf silinmiş hali
+            collect(self._fuzzy.get(prefix), FUZZY_SCORE)
+            for deleted in _deletions(prefix):
+                # Fazla harf: terimden bir harf silinince önek oluyor
+                collect(self._prefixes.get(deleted), FUZZY_SCORE)
+                # Yanlış ya da yer değiştirmiş harf: ikisinden birer harf silinince eşleşiyor
+                collect(self._fuzzy.get(deleted), FUZZY_SCORE)
+        return scores
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        category: Optional[Category] = None,
+        include_unavailable: bool = False,
+    ) -> List[MenuItem]:
+        terms = tokenize(query)[:MAX_QUERY_TERMS]
+        if not terms:
+            return []
+        with self._lock:
+            totals: Optional[Dict[int, int]] = None
+            # Her terim en az bir kelimeyle eşleşmeli
+            for term in terms:
+                scores = self._match_term(term)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {item_id: total + scores[item_id] for item_id, total in totals.items() if item_id in scores}
+                if not totals:
+                    return []
+            results = [
+                (score, self._items[item_id])
+                for item_id, score in totals.items()
+                if (include_unavailable or self._items[item_id].is_available)
+                and (category is None or self._items[item_id].category == category)
+            ]
+        results.sort(key=lambda result: (-result[0], result[1].name, result[1].id))
+        return [item for _, item in results[:limit]]
+
+
+menu_search = MenuSearchIndex()
+
+
+def search_menu_sql(
+    db: Session,
+    query: str,
+    limit: int = 10,
+    category: Optional[Category] = None,
+    include_unavailable: bool = False,
+) -> List[MenuItem]:
+    """İndeks kullanılamadığında yedek arama: her kelime isim ya da açıklamada geçmeli.
+
+    Yazım hatası toleransı ve Türkçe karakter sadeleştirmesi yoktur.
+    """
+    terms = query.split()[:MAX_QUERY_TERMS]
+    if not terms:
+        return []
+    stmt = db.query(MenuItemModel).filter(and_(*(
+        or_(MenuItemModel.name.icontains(term, autoescape=True), MenuItemModel.description.icontains(term, autoescape=True))
+        for term in terms
+    )))
+    if category is not None:
+        stmt = stmt.filter(MenuItemModel.category == category)
+    if not include_unavailable:
+        stmt = stmt.filter(MenuItemModel.is_available.is_(True))
+    return [MenuItem.model_validate(item) for item in stmt.order_by(MenuItemModel.name, MenuItemModel.id).limit(limit)]
+
+invalidation_bus.subscribe("menu", menu_search.invalidate, include_local=False)
+
+
+async def search_menu(
+    db: AsyncDB,
+    query: str,
+    limit: int = 10,
+    category: Optional[Category] = None,
+    include_unavailable: bool = False,
+) -> List[MenuItem]:
+    for _ in range(SYNC_ATTEMPTS):
+        if menu_search.loaded:
+            break
+        generation = menu_search.generation
+        items = menu_cache.peek_items()
+        if items is None:
+            items = await db.run_sync(menu_cache.items)
+        menu_search.sync(items, generation)
+    if not menu_search.loaded:
+        # Menü sürekli değişiyor; indeks eşitlenemedi, eski sonuç döndürmek yerine veritabanında ara
+        logger.warning("Menu search index could not be synced after %d attempts; using SQL search", SYNC_ATTEMPTS)
+        return await db.run_sync(search_menu_sql, query, limit, category, include_unavailable)
+    return menu_search.search(query, limit, category, include_unavailable)
@@ -0,0 +1,239 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import database
+
+logger = logging.getLogger(__name__)
+
+# Bu süreyi aşan istekler çalıştırdıkları sorgularla birlikte loglanır
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+# Şifre hash'leyen route'lar bilerek yavaştır; bunlar için ayrı eşik kullanılır
+SLOW_PASSWORD_REQUEST_MS = float(os.getenv("SLOW_PASSWORD_REQUEST_MS", "3000"))
+PASSWORD_ROUTES = {
+    ("POST", "/token"),
+    ("POST", "/users"),
+    ("POST", "/users/"),
+    ("PUT", "/users/{user_id}"),
+}
+# Yavaş istek logunda tutulacak en fazla sorgu sayısı
+SLOW_REQUEST_MAX_QUERIES = int(os.getenv("SLOW_REQUEST_MAX_QUERIES", "20"))
+# /metrics yönetici token'ı ya da (Prometheus gibi toplayıcılar için) "Authorization: Bearer <METRICS_TOKEN>" ister
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    __slots__ = ("query_count", "db_seconds", "queries")
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.queries: List[Tuple[float, str]] = []
+
+
+# Threadpool ve greenlet'ler context'i kopyaladığı için sorgular doğru isteğe yazılır
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram()
+        self.db_latency = Histogram()
+        self.statuses: Dict[int, int] = {}
+        self.queries = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self._lock = threading.Lock()
+        self.queries_outside_requests = 0
+
+    def record(self, method: str, route: str, status_code: int, seconds: float, stats: RequestStats) -> None:
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = RouteMetrics()
+            metrics.latency.observe(seconds)
+            metrics.db_latency.observe(stats.db_seconds)
+            metrics.statuses[status_code] = metrics.statuses.get(status_code, 0) + 1
+            metrics.queries += stats.query_count
+
+    def record_outside_query(self) -> None:
+        with self._lock:
+            self.queries_outside_requests += 1
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            routes = sorted(self._routes.items())
+            _render_histogram(
+                lines, "http_request_duration_seconds", "HTTP request latency by route",
+                [(labels, metrics.latency) for labels, metrics in routes],
+            )
+            _render_histogram(
+                lines, "http_request_db_duration_seconds", "Time spent in SQL per request by route",
+                [(labels, metrics.db_latency) for labels, metrics in routes],
+            )
+            lines.append("# HELP http_requests_total HTTP requests by route and status code")
+            lines.append("# TYPE http_requests_total counter")
+            for (method, route), metrics in routes:
+                for status_code, count in sorted(metrics.statuses.items()):
+                    lines.append(
+                        f'http_requests_total{{method="{method}",route="{route}",status="{status_code}"}} {count}'
+                    )
+            lines.append("# HELP http_request_db_queries_total SQL statements executed by route")
+            lines.append("# TYPE http_request_db_queries_total counter")
+            for (method, route), metrics in routes:
+                lines.append(f'http_request_db_queries_total{{method="{method}",route="{route}"}} {metrics.queries}')
+            lines.append("# HELP db_queries_outside_requests_total SQL statements run outside HTTP requests")
+            lines.append("# TYPE db_queries_outside_requests_total counter")
+            lines.append(f"db_queries_outside_requests_total {self.queries_outside_requests}")
+
+        pool = database.db_pool_stats()
+        for key in ("connects", "checkouts", "checkins"):
+            lines.append(f"# TYPE db_pool_{key}_total counter")
+            lines.append(f"db_pool_{key}_total {pool[key]}")
+        for key in ("checked_out", "max_checked_out"):
+            lines.append(f"# TYPE db_pool_{key} gauge")
+            lines.append(f"db_pool_{key} {pool[key]}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+            self.queries_outside_requests = 0
+
+
+def _render_histogram(lines: List[str], name: str, help_text: str, series) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for (method, route), histogram in series:
+        labels = f'method="{method}",route="{route}"'
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.total:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+
+registry = MetricsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = _current_request.get()
+    if stats is None:
+        registry.record_outside_query()
+        return
+    stats.query_count += 1
+    stats.db_seconds += elapsed
+    if len(stats.queries) < SLOW_REQUEST_MAX_QUERIES:
+        stats.queries.append((elapsed, statement))
+
+
+def instrument_engine(db_engine: Engine) -> None:
+    if event.contains(db_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(db_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(db_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def instrument_database() -> None:
+    instrument_engine(database.engine)
+    if database.async_engine is not None:
+        instrument_engine(database.async_engine.sync_engine)
+
+
+class MetricsMiddleware:
+    """Her isteğin süresini ve çalıştırdığı SQL sorgularını route bazında kaydeder."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        status_holder = {"status": 500, "streaming": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+                status_holder["streaming"] = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_request.reset(token)
+            # Yol parametreleri yerine route şablonu kullanılır (/orders/{order_id})
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            registry.record(scope["method"], route_path, status_holder["status"], elapsed, stats)
+            # SSE bağlantıları uzun sürmesi gereken isteklerdir, yavaş sayılmaz
+            if elapsed * 1000 >= _slow_threshold_ms(scope["method"], route_path) and not status_holder["streaming"]:
+                _log_slow_request(scope, status_holder["status"], elapsed, stats)
+
+
+def _slow_threshold_ms(method: str, route_path: str) -> float:
+    if (method, route_path) in PASSWORD_ROUTES:
+        return SLOW_PASSWORD_REQUEST_MS
+    return SLOW_REQUEST_MS
+
+
+def _log_slow_request(scope, status_code: int, elapsed: float, stats: RequestStats) -> None:
+    queries = "\n".join(
+        f"  {seconds * 1000:.1f} ms: {' '.join(statement.split())}"
+        for seconds, statement in sorted(stats.queries, key=lambda query: query[0], reverse=True)
+    )
+    logger.warning(
+        "Slow request %s %s -> %s in %.1f ms (%d queries, %.1f ms in DB)\n%s",
+        scope["method"], scope["path"], status_code, elapsed * 1000,
+        stats.query_count, stats.db_seconds * 1000, queries,
+    )
+
+
+def metrics_token_matches(request: Request) -> bool:
+    return bool(METRICS_TOKEN) and request.headers.get("authorization") == f"Bearer {METRICS_TOKEN}"
+
+
+def metrics_response() -> Response:
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,8 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Enum, Boolean, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, Enum, Boolean, Date, DateTime, LargeBinary, Index, UniqueConstraint, insert_sentinel
+from sqlalchemy.orm import relationship, synonym
 from sqlalchemy.sql import func
 from database import Base
-from schemas import UserRole, Category, OrderStatus
+from schemas import UserRole, Category, OrderStatus, TableStatus
 
 class User(Base):
     __tablename__ = "users"
@@ -13,11 +13,49 @@ class User(Base):
     full_name = Column(String)
     role = Column(Enum(UserRole))
     is_active = Column(Boolean, default=True)
+    # Şifre/rol değişince ya da kullanıcı pasifleşince artar; eski token'lar geçersiz olur
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     orders = relationship("Order", back_populates="user")
 
+    @property
+    def is_admin(self) -> bool:
+        return self.role == UserRole.ADMIN
+
+    @property
+    def is_waiter(self) -> bool:
+        return self.role == UserRole.WAITER
+
+    @property
+    def is_kitchen_staff(self) -> bool:
+        return self.role == UserRole.KITCHEN
+
+class TokenRevocation(Base):
+    # Silinen kullanıcılar; bu andan önce verilmiş token'lar yeniden başlatmadan sonra da reddedilir
+    __tablename__ = "token_revocations"
+
+    user_id = Column(Integer, primary_key=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=False)
+
+class IdempotencyRecord(Base):
+    """Idempotency-Key ile gelen isteğin sonucu; tüm worker'lar bu tabloyu paylaşır."""
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    scope = Column(String, nullable=False)
+    key = Column(String, nullable=False)
+    fingerprint = Column(String, nullable=False)
+    # İstek sürerken NULL; tamamlanınca yanıtın JSON hali
+    response = Column(Text)
+    created_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "scope", "key", name="uq_idempotency_keys_user_scope_key"),
+    )
+
 class MenuItem(Base):
     __tablename__ = "menu_items"
 
@@ -38,14 +76,28 @@ class Order(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     table_id = Column(Integer, ForeignKey("tables.id"))
+    # Sipariş verildiğinde masada açık olan oturum (bkz. TableSession)
+    session_id = Column(Integer, ForeignKey("table_sessions.id"), index=True)
     status = Column(Enum(OrderStatus), default=OrderStatus.PENDING)
     total_amount = Column(Float)
+    # İyimser eşzamanlılık: UPDATE ... WHERE version = ? (bkz. __mapper_args__)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Toplu INSERT ... RETURNING satırlarını parametre sırasına dizmek için; SQLite
+    # sıra garantisi vermediğinden bu sütun olmadan her satır ayrı INSERT ile yazılır
+    _sentinel = insert_sentinel("_sentinel")
 
     user = relationship("User", back_populates="orders")
     table = relationship("Table", back_populates="orders", foreign_keys=[table_id])
     items = relationship("OrderItem", back_populates="order")
+    session = relationship("TableSession", back_populates="orders")
+
+    __table_args__ = (
+        Index("ix_orders_status_created_at", "status", "created_at"),
+        Index("ix_orders_created_at_id", "created_at", "id"),
+    )
+    __mapper_args__ = {"version_id_col": version}
 
 class Table(Base):
     __tablename__ = "tables"
@@ -54,21 +106,96 @@ class Table(Base):
     number = Column(Integer, unique=True, index=True)
     capacity = Column(Integer)
     is_occupied = Column(Boolean, default=False)
+    status = Column(Enum(TableStatus), default=TableStatus.AVAILABLE, server_default=TableStatus.AVAILABLE.name)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Açık oturumun özeti; masa listesi ve olaylar geçmiş tablosuna gitmeden bunu taşır
+    seated_at = Column(DateTime(timezone=True))
+    party_size = Column(Integer)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     orders = relationship("Order", back_populates="table", foreign_keys=[Order.table_id])
+    # Masa silinince oturum geçmişi de silinir; siparişlerin session_id'si boşaltılır
+    sessions = relationship("TableSession", back_populates="table", cascade="all, delete-orphan")
+    qr_image = relationship("TableQRCode", uselist=False, cascade="all, delete-orphan")
+
+    __mapper_args__ = {"version_id_col": version}
+
+class TableSession(Base):
+    """Masanın bir oturumu: misafirlerin oturduğu ve masanın boşaldığı an."""
+    __tablename__ = "table_sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    table_id = Column(Integer, ForeignKey("tables.id"), nullable=False)
+    party_size = Column(Integer)
+    seated_at = Column(DateTime(timezone=True), nullable=False)
+    cleared_at = Column(DateTime(timezone=True))
+    # Kapanışta hesaplanır; ortalama dönüş süresi veritabanına özgü tarih fonksiyonu gerektirmez
+    turn_seconds = Column(Integer)
+
+    table = relationship("Table", back_populates="sessions")
+    orders = relationship("Order", back_populates="session")
+
+    __table_args__ = (
+        Index("ix_table_sessions_table_id_cleared_at", "table_id", "cleared_at"),
+    )
+
+class TableQRCode(Base):
+    __tablename__ = "table_qr_codes"
+
+    table_id = Column(Integer, ForeignKey("tables.id"), primary_key=True)
+    png = Column(LargeBinary)
+    content_hash = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
 class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"))
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True)
     menu_item_id = Column(Integer, ForeignKey("menu_items.id"))
     quantity = Column(Integer)
     price_at_time = Column(Float)
+    # schemas.OrderItem alanı "price" olarak kullanıyor
+    price = synonym("price_at_time")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bkz. Order._sentinel
+    _sentinel = insert_sentinel("_sentinel")
 
     order = relationship("Order", back_populates="items")
-    menu_item = relationship("MenuItem", back_populates="order_items") 
\ No newline at end of file
+    menu_item = relationship("MenuItem", back_populates="order_items")
+
+# Raporlama için özet tablolar; sipariş DELIVERED olduğunda artırılır (bkz. rollups.py)
+class DailySales(Base):
+    __tablename__ = "daily_sales"
+
+    day = Column(Date, primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    item_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+class HourlySales(Base):
+    __tablename__ = "hourly_sales"
+
+    day = Column(Date, primary_key=True)
+    hour = Column(Integer, primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+class MenuItemDailySales(Base):
+    __tablename__ = "menu_item_daily_sales"
+
+    day = Column(Date, primary_key=True)
+    menu_item_id = Column(Integer, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+class TableDailySales(Base):
+    __tablename__ = "table_daily_sales"
+
+    day = Column(Date, primary_key=True)
+    table_id = Column(Integer, primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
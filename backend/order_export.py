@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import Order as OrderModel, OrderItem as OrderItemModel
+from schemas import OrderStatus
+
+# Sunucu tarafı imleçten her seferinde alınacak satır sayısı
+EXPORT_BATCH_SIZE = 1000
+# İstemciye gönderilmeden önce biriktirilecek yaklaşık bayt sayısı
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+CSV_COLUMNS = [
+    "order_id", "created_at", "table_id", "user_id", "status", "total_amount",
+    "item_id", "menu_item_id", "quantity", "price", "line_total",
+]
+
+
+def _export_rows(
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+    status: Optional[OrderStatus],
+):
+    # Yanıt gövdesi endpoint döndükten sonra üretildiği için kendi oturumunu açar
+    stmt = (
+        select(
+            OrderModel.id,
+            OrderModel.created_at,
+            OrderModel.table_id,
+            OrderModel.user_id,
+            OrderModel.status,
+            OrderModel.total_amount,
+            OrderItemModel.id,
+            OrderItemModel.menu_item_id,
+            OrderItemModel.quantity,
+            OrderItemModel.price_at_time,
+        )
+        .outerjoin(OrderItemModel, OrderItemModel.order_id == OrderModel.id)
+        .order_by(OrderModel.created_at, OrderModel.id, OrderItemModel.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    if created_from:
+        stmt = stmt.where(OrderModel.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(OrderModel.created_at < created_to)
+    if status:
+        stmt = stmt.where(OrderModel.status == status)
+
+    db = SessionLocal()
+    try:
+        yield from db.execute(stmt)
+    finally:
+        db.close()
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def iter_orders_csv(
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    status: Optional[OrderStatus] = None,
+) -> Iterator[str]:
+    """Kalem başına bir satır; kalemi olmayan siparişler boş kalem alanlarıyla yazılır."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for (order_id, created_at, table_id, user_id, order_status, total_amount,
+         item_id, menu_item_id, quantity, price) in _export_rows(created_from, created_to, status):
+        writer.writerow([
+            order_id, _isoformat(created_at), table_id, user_id, order_status.value, total_amount,
+            item_id, menu_item_id, quantity, price,
+            price * quantity if item_id is not None else None,
+        ])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_orders_ndjson(
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    status: Optional[OrderStatus] = None,
+) -> Iterator[str]:
+    """Sipariş başına bir JSON satırı; satırlar sıralı geldiği için kalemler yerinde gruplanır."""
+    chunk = []
+    size = 0
+    current = None
+    for (order_id, created_at, table_id, user_id, order_status, total_amount,
+         item_id, menu_item_id, quantity, price) in _export_rows(created_from, created_to, status):
+        if current is None or current["id"] != order_id:
+            if current is not None:
+                line = json.dumps(current) + "\n"
+                chunk.append(line)
+                size += len(line)
+                if size >= EXPORT_CHUNK_BYTES:
+                    yield "".join(chunk)
+                    chunk, size = [], 0
+            current = {
+                "id": order_id,
+                "created_at": _isoformat(created_at),
+                "table_id": table_id,
+                "user_id": user_id,
+                "status": order_status.value,
+                "total_amount": total_amount,
+                "items": [],
+            }
+        if item_id is not None:
+            current["items"].append({
+                "id": item_id,
+                "menu_item_id": menu_item_id,
+                "quantity": quantity,
+                "price": price,
+            })
+    if current is not None:
+        chunk.append(json.dumps(current) + "\n")
+    yield "".join(chunk)
@@ -0,0 +1,57 @@
+import hashlib
+import os
+from io import BytesIO
+from typing import Tuple
+
+import qrcode
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Table, TableQRCode
+
+# QR kodun yönlendirdiği menü adresi
+QR_BASE_URL = os.getenv("QR_BASE_URL", "http://localhost:3000/menu")
+
+
+def render_qr_png(table_id: int) -> Tuple[bytes, str]:
+    # Adres masa numarasını değil değişmeyen masa id'sini içerir; numara değişince kod aynı kalır.
+    # Süreç havuzunda da çalıştığı için sadece ham veri döner
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(f"{QR_BASE_URL}/{table_id}")
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    png = buffered.getvalue()
+    return png, hashlib.sha256(png).hexdigest()
+
+
+def store_qr_code(table: Table, png: bytes, content_hash: str) -> TableQRCode:
+    if table.qr_image is None:
+        table.qr_image = TableQRCode(png=png, content_hash=content_hash)
+    elif table.qr_image.content_hash != content_hash:
+        table.qr_image.png = png
+        table.qr_image.content_hash = content_hash
+    return table.qr_image
+
+
+def refresh_qr_code(table: Table) -> TableQRCode:
+    return store_qr_code(table, *render_qr_png(table.id))
+
+
+
+def render_missing_qr_codes(db: Session) -> int:
+    """QR kodu olmayan masaların (ön üretimden önce açılanlar) kodlarını üretir.
+
+    Açılışta çalışır; QR endpoint'i kimlik doğrulama istemediği için kod üretmez.
+    Aynı anda açılan başka bir worker kodları önce yazdıysa onun sonucu kalır.
+    """
+    tables = db.query(Table).filter(~Table.qr_image.has()).all()
+    for table in tables:
+        refresh_qr_code(table)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return 0
+    return len(tables)
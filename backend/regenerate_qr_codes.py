@@ -0,0 +1,47 @@
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, engine, upgrade_schema
+import models
+from qr_codes import render_qr_png, store_qr_code
+
+# Loglama ayarları
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def regenerate_all_qr_codes(db: Session, workers: int) -> int:
+    # PNG üretimi CPU'ya bağlı; kodlar süreç havuzunda paralel üretilir
+    tables: List[models.Table] = db.query(models.Table).all()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(render_qr_png, [table.id for table in tables])
+        for table, (png, content_hash) in zip(tables, results):
+            store_qr_code(table, png, content_hash)
+    db.commit()
+    return len(tables)
+
+def main():
+    parser = argparse.ArgumentParser(description="Tüm masaların QR kodlarını yeniden üretir (ör. QR_BASE_URL değişince)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="paralel çalışacak süreç sayısı")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    upgrade_schema(models.Base.metadata)
+
+    db = SessionLocal()
+    try:
+        count = regenerate_all_qr_codes(db, args.workers)
+        logger.info(f"{count} masanın QR kodu yeniden üretildi")
+    except Exception as e:
+        logger.error(f"QR kodları üretilirken hata: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import os
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import (
+    DailySales,
+    HourlySales,
+    MenuItemDailySales,
+    Order as OrderModel,
+    OrderItem as OrderItemModel,
+    TableDailySales,
+)
+from schemas import OrderStatus
+
+# Gün ve saat kırılımları restoranın yerel saatine göre yapılır (zaman damgaları UTC saklanır)
+RESTAURANT_TIMEZONE = ZoneInfo(os.getenv("RESTAURANT_TIMEZONE", "Europe/Istanbul"))
+
+ROLLUP_MODELS = (DailySales, HourlySales, MenuItemDailySales, TableDailySales)
+
+
+def _increment(db: Session, model, keys: Dict, deltas: Dict) -> None:
+    # Satır yoksa oluştur, varsa sayaçları artır (tek sorguda upsert)
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert_stmt = (sqlite_insert if dialect == "sqlite" else postgresql_insert)(model)
+        stmt = insert_stmt.values(**keys, **deltas).on_conflict_do_update(
+            index_elements=list(keys),
+            set_={name: getattr(model, name) + insert_stmt.excluded[name] for name in deltas},
+        )
+        db.execute(stmt)
+        return
+    row = db.get(model, tuple(keys.values()))
+    if row is None:
+        db.add(model(**keys, **deltas))
+    else:
+        for name, value in deltas.items():
+            setattr(row, name, getattr(row, name) + value)
+
+
+def local_time(moment: datetime) -> datetime:
+    # SQLite zaman damgaları UTC ve saat dilimsiz döner
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(RESTAURANT_TIMEZONE)
+
+
+def _utc_bounds(start: date, end: date) -> Tuple[datetime, datetime]:
+    # Yerel [start, end] günlerinin UTC karşılığı; sütunla karşılaştırmak için saat dilimsiz
+    lower = datetime.combine(start, time.min, tzinfo=RESTAURANT_TIMEZONE)
+    upper = datetime.combine(end + timedelta(days=1), time.min, tzinfo=RESTAURANT_TIMEZONE)
+    return (
+        lower.astimezone(timezone.utc).replace(tzinfo=None),
+        upper.astimezone(timezone.utc).replace(tzinfo=None),
+    )
+
+
+def apply_order(db: Session, order: OrderModel) -> None:
+    """Teslim edilen siparişi özet tablolara ekler.
+
+    Commit çağırana bırakılır; durum değişikliğiyle aynı işlemde yazılır.
+    """
+    if order.created_at is None:
+        return
+    created_at = local_time(order.created_at)
+    day = created_at.date()
+    revenue = sum(item.price_at_time * item.quantity for item in order.items)
+    item_count = sum(item.quantity for item in order.items)
+
+    _increment(db, DailySales, {"day": day}, {
+        "order_count": 1, "item_count": item_count, "revenue": revenue,
+    })
+    _increment(db, HourlySales, {"day": day, "hour": created_at.hour}, {
+        "order_count": 1, "revenue": revenue,
+    })
+    if order.table_id is not None:
+        _increment(db, TableDailySales, {"day": day, "table_id": order.table_id}, {
+            "order_count": 1, "revenue": revenue,
+        })
+    per_item: Dict[int, Tuple[int, float]] = {}
+    for item in order.items:
+        quantity, item_revenue = per_item.get(item.menu_item_id, (0, 0.0))
+        per_item[item.menu_item_id] = (quantity + item.quantity, item_revenue + item.price_at_time * item.quantity)
+    for menu_item_id, (quantity, item_revenue) in per_item.items():
+        _increment(db, MenuItemDailySales, {"day": day, "menu_item_id": menu_item_id}, {
+            "quantity": quantity, "revenue": item_revenue,
+        })
+
+
+def apply_status_change(db: Session, order: OrderModel, previous_status: OrderStatus) -> None:
+    # DELIVERED son durumdur (bkz. ORDER_STATUS_TRANSITIONS); teslimat geri alınmaz
+    if previous_status != OrderStatus.DELIVERED and order.status == OrderStatus.DELIVERED:
+        apply_order(db, order)
+
+
+def _day_chunks(start: date, end: date, chunk_days: int) -> Iterator[Tuple[date, date]]:
+    while start <= end:
+        chunk_end = min(start + timedelta(days=chunk_days - 1), end)
+        yield start, chunk_end
+        start = chunk_end + timedelta(days=1)
+
+
+def _rebuild_range(db: Session, start: date, end: date) -> None:
+    # Sipariş toplamları veritabanında hesaplanır; yerel gün ve saate ayırma Python'da
+    # yapılır çünkü SQLite saat dilimi dönüşümü desteklemez
+    lower, upper = _utc_bounds(start, end)
+    delivered = (
+        OrderModel.status == OrderStatus.DELIVERED,
+        OrderModel.created_at >= lower,
+        OrderModel.created_at < upper,
+    )
+    line_revenue = OrderItemModel.price_at_time * OrderItemModel.quantity
+
+    for model in ROLLUP_MODELS:
+        db.execute(delete(model).where(model.day >= start, model.day <= end))
+
+    daily: Dict[date, List] = defaultdict(lambda: [0, 0, 0.0])
+    hourly: Dict[Tuple[date, int], List] = defaultdict(lambda: [0, 0.0])
+    per_table: Dict[Tuple[date, int], List] = defaultdict(lambda: [0, 0.0])
+    order_totals = db.execute(
+        select(
+            OrderModel.table_id,
+            OrderModel.created_at,
+            func.coalesce(func.sum(OrderItemModel.quantity), 0),
+            func.coalesce(func.sum(line_revenue), 0),
+        )
+        .select_from(OrderModel)
+        .outerjoin(OrderItemModel, OrderItemModel.order_id == OrderModel.id)
+        .where(*delivered)
+        .group_by(OrderModel.id)
+    )
+    for table_id, created_at, item_count, revenue in order_totals:
+        created_at = local_time(created_at)
+        day = created_at.date()
+        totals = daily[day]
+        totals[0] += 1
+        totals[1] += item_count
+        totals[2] += revenue
+        totals = hourly[(day, created_at.hour)]
+        totals[0] += 1
+        totals[1] += revenue
+        if table_id is not None:
+            totals = per_table[(day, table_id)]
+            totals[0] += 1
+            totals[1] += revenue
+
+    per_item: Dict[Tuple[date, int], List] = defaultdict(lambda: [0, 0.0])
+    item_totals = db.execute(
+        select(
+            OrderModel.created_at,
+            OrderItemModel.menu_item_id,
+            func.sum(OrderItemModel.quantity),
+            func.sum(line_revenue),
+        )
+        .select_from(OrderModel)
+        .join(OrderItemModel, OrderItemModel.order_id == OrderModel.id)
+        .where(*delivered)
+        .group_by(OrderModel.id, OrderItemModel.menu_item_id)
+    )
+    for created_at, menu_item_id, quantity, revenue in item_totals:
+        totals = per_item[(local_time(created_at).date(), menu_item_id)]
+        totals[0] += quantity
+        totals[1] += revenue
+
+    rows = (
+        (DailySales, [
+            {"day": day, "order_count": count, "item_count": items, "revenue": revenue}
+            for day, (count, items, revenue) in daily.items()
+        ]),
+        (HourlySales, [
+            {"day": day, "hour": hour, "order_count": count, "revenue": revenue}
+            for (day, hour), (count, revenue) in hourly.items()
+        ]),
+        (TableDailySales, [
+            {"day": day, "table_id": table_id, "order_count": count, "revenue": revenue}
+            for (day, table_id), (count, revenue) in per_table.items()
+        ]),
+        (MenuItemDailySales, [
+            {"day": day, "menu_item_id": menu_item_id, "quantity": quantity, "revenue": revenue}
+            for (day, menu_item_id), (quantity, revenue) in per_item.items()
+        ]),
+    )
+    for model, values in rows:
+        if values:
+            db.execute(insert(model), values)
+
+
+def backfill_rollups(
+    db: Session,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    chunk_days: int = 7,
+) -> int:
+    """Özet tabloları sipariş geçmişinden yeniden hesaplar; işlenen gün sayısını döner.
+
+    Her parça ayrı işlemde yazılır ki canlı veritabanı uzun süre kilitlenmesin.
+    """
+    if start is None or end is None:
+        first, last = db.execute(
+            select(func.min(OrderModel.created_at), func.max(OrderModel.created_at))
+        ).one()
+        if first is None:
+            return 0
+        start = start or local_time(first).date()
+        end = end or local_time(last).date()
+    days = 0
+    for chunk_start, chunk_end in _day_chunks(start, end, chunk_days):
+        _rebuild_range(db, chunk_start, chunk_end)
+        db.commit()
+        days += (chunk_end - chunk_start).days + 1
+    return days
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
+from typing import List, Optional
+from database import AsyncDB, get_async_db
 from models import MenuItem as MenuItemModel
 from schemas import MenuItem, MenuItemCreate, MenuItemUpdate, Category
-from auth import get_current_user
+from auth import get_current_user, get_token_claims
+from invalidation import invalidation_bus
+from menu_cache import menu_response
+from menu_search import menu_search, search_menu
+from serialization import json_response, menu_item_list_adapter
 
 router = APIRouter(
     prefix="/menu",
@@ -12,76 +16,99 @@ router = APIRouter(
 )
 
 @router.get("/items", response_model=List[MenuItem])
-def get_menu_items(
+async def get_menu_items(
+    request: Request,
     category: Category = None,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(get_token_claims)
 ):
-    query = db.query(MenuItemModel)
-    if category:
-        query = query.filter(MenuItemModel.category == category)
-    return query.all()
+    return await menu_response(request, db, category)
 
-@router.get("/items/{item_id}", response_model=MenuItem)
-def get_menu_item(
-    item_id: int,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+@router.get("/search", response_model=List[MenuItem])
+async def search_menu_items(
+    q: str = Query(..., min_length=1, max_length=100),
+    category: Optional[Category] = None,
+    include_unavailable: bool = False,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(get_token_claims)
 ):
+    # Garsonun hızlı sipariş girişi: önek ve tek harf hatalı eşleşmeler, bellekteki indeksten
+    items = await search_menu(db, q, limit, category, include_unavailable)
+    return json_response(menu_item_list_adapter.dump_json(items))
+
+def find_menu_item(db: Session, item_id: int) -> MenuItemModel:
     item = db.query(MenuItemModel).filter(MenuItemModel.id == item_id).first()
     if not item:
         raise HTTPException(status_code=404, detail="Menu item not found")
     return item
 
+@router.get("/items/{item_id}", response_model=MenuItem)
+async def get_menu_item(
+    item_id: int,
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(get_token_claims)
+):
+    return await db.run_sync(find_menu_item, item_id)
+
+def add_menu_item(db: Session, item: MenuItemCreate) -> MenuItemModel:
+    db_item = MenuItemModel(**item.dict())
+    db.add(db_item)
+    db.commit()
+    db.refresh(db_item)
+    invalidation_bus.publish("menu")
+    menu_search.upsert(MenuItem.model_validate(db_item))
+    return db_item
+
 @router.post("/items", response_model=MenuItem)
-def create_menu_item(
+async def create_menu_item(
     item: MenuItemCreate,
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    db_item = MenuItemModel(**item.dict())
-    db.add(db_item)
+    return await db.run_sync(add_menu_item, item)
+
+def change_menu_item(db: Session, item_id: int, item: MenuItemUpdate) -> MenuItemModel:
+    db_item = find_menu_item(db, item_id)
+    for key, value in item.dict(exclude_unset=True).items():
+        setattr(db_item, key, value)
+    
     db.commit()
     db.refresh(db_item)
+    invalidation_bus.publish("menu")
+    menu_search.upsert(MenuItem.model_validate(db_item))
     return db_item
 
 @router.put("/items/{item_id}", response_model=MenuItem)
-def update_menu_item(
+async def update_menu_item(
     item_id: int,
     item: MenuItemUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    db_item = db.query(MenuItemModel).filter(MenuItemModel.id == item_id).first()
-    if not db_item:
-        raise HTTPException(status_code=404, detail="Menu item not found")
-    
-    for key, value in item.dict(exclude_unset=True).items():
-        setattr(db_item, key, value)
-    
+    return await db.run_sync(change_menu_item, item_id, item)
+
+def remove_menu_item(db: Session, item_id: int) -> None:
+    db_item = find_menu_item(db, item_id)
+    db.delete(db_item)
     db.commit()
-    db.refresh(db_item)
-    return db_item
+    invalidation_bus.publish("menu")
+    menu_search.remove(item_id)
 
 @router.delete("/items/{item_id}")
-def delete_menu_item(
+async def delete_menu_item(
     item_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    db_item = db.query(MenuItemModel).filter(MenuItemModel.id == item_id).first()
-    if not db_item:
-        raise HTTPException(status_code=404, detail="Menu item not found")
-    
-    db.delete(db_item)
-    db.commit()
-    return {"message": "Menu item deleted"} 
\ No newline at end of file
+    await db.run_sync(remove_menu_item, item_id)
+    return {"message": "Menu item deleted"}
\ No newline at end of file
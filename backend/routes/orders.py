@@ -1,93 +1,349 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from database import get_db
+from collections import defaultdict
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, insert, or_, select
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import List, Optional, Tuple, Union
+from database import AsyncDB, flush_versioned, get_async_db
+from etags import cache_headers, data_etag, etag_matches, not_modified_response
+from events import order_feed, sse_response
+from floor import open_session_ids
+from idempotency import Completion, run_idempotent
+from invalidation import invalidation_bus
+from kitchen_queue import get_kitchen_queue
+from menu_cache import menu_cache
+from order_export import iter_orders_csv, iter_orders_ndjson
+from rollups import apply_status_change
 from models import Order as OrderModel, OrderItem as OrderItemModel
-from schemas import Order, OrderCreate, OrderUpdate, OrderStatus
-from auth import get_current_user
+from serialization import dump_json, json_response, order_list_adapter
+from schemas import KitchenQueue, Order, OrderCreate, OrderUpdate, OrderStatus
+from auth import get_current_user, get_token_claims
 
 router = APIRouter(
     prefix="/orders",
     tags=["orders"]
 )
 
-@router.get("", response_model=List[Order])
-def get_orders(
+def publish_order_event(event_type: str, order: Union[OrderModel, Order]) -> None:
+    # Veri sürümü olaydan önce artar: yeni imleci gören istek eski ETag ile 304 alamaz
+    invalidation_bus.publish("orders", str(order.id))
+    order_feed.publish(event_type, Order.model_validate(order).model_dump(mode="json"))
+
+def query_orders(db: Session):
+    # Kalemler serileştirme sırasında sipariş başına ayrı sorgu yerine tek IN sorgusuyla yüklenir
+    return db.query(OrderModel).options(selectinload(OrderModel.items))
+
+def list_orders(
+    db: Session,
     status: Optional[OrderStatus] = None,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
-):
-    query = db.query(OrderModel)
+    table_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[int] = None,
+    limit: int = 100
+) -> List[OrderModel]:
+    query = query_orders(db)
     if status:
         query = query.filter(OrderModel.status == status)
-    return query.all()
+    if table_id is not None:
+        query = query.filter(OrderModel.table_id == table_id)
+    if user_id is not None:
+        query = query.filter(OrderModel.user_id == user_id)
+    if created_from:
+        query = query.filter(OrderModel.created_at >= created_from)
+    if created_to:
+        query = query.filter(OrderModel.created_at < created_to)
+    if cursor is not None:
+        # Keyset sayfalama: imleç, önceki sayfanın son siparişinin id'si.
+        # created_at karşılaştırması veritabanındaki değerle yapılır.
+        anchor = select(OrderModel.created_at).where(OrderModel.id == cursor).scalar_subquery()
+        query = query.filter(or_(
+            OrderModel.created_at < anchor,
+            and_(OrderModel.created_at == anchor, OrderModel.id < cursor)
+        ))
+    orders = query.order_by(OrderModel.created_at.desc(), OrderModel.id.desc()).limit(limit).all()
+    if cursor is not None and not orders and db.get(OrderModel, cursor) is None:
+        # İmleç siparişi sayfalar arasında silinmiş; boş sayfa sayfalamanın bittiği sanılmasın
+        raise HTTPException(status_code=400, detail="Cursor order no longer exists, restart pagination")
+    return orders
 
-@router.get("/active", response_model=List[Order])
-def get_active_orders(
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+@router.get("", response_model=List[Order])
+async def get_orders(
+    request: Request,
+    status: Optional[OrderStatus] = None,
+    table_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(get_token_claims)
 ):
-    return db.query(OrderModel).filter(
+    etag = data_etag(request, "orders")
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    orders = await db.run_sync(
+        list_orders,
+        status=status,
+        table_id=table_id,
+        user_id=user_id,
+        created_from=created_from,
+        created_to=created_to,
+        cursor=cursor,
+        limit=limit
+    )
+    headers = {"X-Next-Cursor": str(orders[-1].id)} if len(orders) == limit else None
+    return json_response(dump_json(order_list_adapter, orders), cache_headers(etag, headers))
+
+def list_active_orders(db: Session) -> List[OrderModel]:
+    return query_orders(db).filter(
         OrderModel.status.in_([OrderStatus.PENDING, OrderStatus.PREPARING])
     ).all()
 
-@router.get("/{order_id}", response_model=Order)
-def get_order(
-    order_id: int,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+@router.get("/active", response_model=List[Order])
+async def get_active_orders(
+    request: Request,
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(get_token_claims)
+):
+    # Sorgudan önce alınan imleç ile /orders/stream arada kalan olayları da gönderir.
+    # 304 de imleci taşır; tarayıcı önbelleği saklanan başlıkları bununla günceller.
+    headers = {"X-Feed-Cursor": str(order_feed.cursor)}
+    etag = data_etag(request, "orders")
+    if etag_matches(request, etag):
+        return not_modified_response(etag, headers)
+    orders = await db.run_sync(list_active_orders)
+    return json_response(dump_json(order_list_adapter, orders), cache_headers(etag, headers))
+
+@router.get("/kitchen-queue", response_model=KitchenQueue)
+async def get_kitchen_queue_view(
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(get_token_claims)
 ):
-    order = db.query(OrderModel).filter(OrderModel.id == order_id).first()
+    # Mutfak ekranı: istasyonlara göre gruplanmış, öncelik sırasına dizilmiş fişler
+    return await get_kitchen_queue(db)
+
+@router.get("/export")
+async def export_orders(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    status: Optional[OrderStatus] = None,
+    current_user = Depends(get_token_claims)
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    # Satırlar sunucu tarafı imleçle parça parça okunup yazılır; bellek kullanımı sabit kalır
+    if format == "csv":
+        body, media_type = iter_orders_csv(created_from, created_to, status), "text/csv"
+    else:
+        body, media_type = iter_orders_ndjson(created_from, created_to, status), "application/x-ndjson"
+    period = "-".join(value.date().isoformat() for value in (created_from, created_to) if value)
+    filename = f"orders-{period}.{format}" if period else f"orders.{format}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.get("/stream")
+async def stream_orders(
+    request: Request,
+    cursor: Optional[int] = None,
+    current_user = Depends(get_token_claims)
+):
+    return sse_response(order_feed, request, cursor)
+
+def find_order(db: Session, order_id: int) -> OrderModel:
+    order = query_orders(db).filter(OrderModel.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
+@router.get("/{order_id}", response_model=Order)
+async def get_order(
+    order_id: int,
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(get_token_claims)
+):
+    return await db.run_sync(find_order, order_id)
+
+def price_orders(db: Session, orders: List[OrderCreate]) -> List[Tuple[float, List[dict]]]:
+    # Fiyatlar menü önbelleğinden okunur (menü değişince sürümü artar); kalem başına sorgu yapılmaz
+    menu_items = menu_cache.items(db)
+    priced = []
+    for order in orders:
+        total = 0.0
+        rows = []
+        for item in order.items:
+            menu_item = menu_items.get(item.menu_item_id)
+            if menu_item is None:
+                raise HTTPException(status_code=400, detail=f"Menu item {item.menu_item_id} not found")
+            if not menu_item.is_available:
+                raise HTTPException(status_code=400, detail=f"Menu item {menu_item.name} is not available")
+            if item.quantity < 1:
+                raise HTTPException(status_code=400, detail="Quantity must be at least 1")
+            total += menu_item.price * item.quantity
+            rows.append({
+                "menu_item_id": item.menu_item_id,
+                "quantity": item.quantity,
+                "price_at_time": menu_item.price,
+            })
+        priced.append((round(total, 2), rows))
+    return priced
+
+def save_orders(
+    db: Session,
+    orders: List[OrderCreate],
+    user_id: int,
+    complete: Optional[Completion] = None
+) -> List[Order]:
+    # Sipariş ve kalemler toplu INSERT ile tek işlemde yazılır; yanıt için tekrar okunmaz.
+    # RETURNING satırları parametre sırasıyla döner (sort_by_parameter_order).
+    if not orders:
+        return []
+    priced = price_orders(db, orders)
+    sessions = open_session_ids(db, (order.table_id for order in orders))
+    db_orders = db.scalars(
+        insert(OrderModel).returning(OrderModel, sort_by_parameter_order=True),
+        [
+            {
+                "user_id": user_id,
+                "table_id": order.table_id,
+                "session_id": sessions.get(order.table_id),
+                "status": OrderStatus.PENDING,
+                "total_amount": total,
+            }
+            for order, (total, _) in zip(orders, priced)
+        ]
+    ).all()
+    item_rows = [
+        dict(row, order_id=db_order.id)
+        for db_order, (_, rows) in zip(db_orders, priced)
+        for row in rows
+    ]
+    db_items = db.scalars(
+        insert(OrderItemModel).returning(OrderItemModel, sort_by_parameter_order=True),
+        item_rows
+    ).all() if item_rows else []
+
+    items_by_order = defaultdict(list)
+    for db_item in db_items:
+        items_by_order[db_item.order_id].append(db_item)
+    for db_order in db_orders:
+        set_committed_value(db_order, "items", items_by_order[db_order.id])
+    created = [Order.model_validate(db_order) for db_order in db_orders]
+    if complete is not None:
+        complete(db, created)
+    db.commit()
+    for order in created:
+        publish_order_event("order_created", order)
+    return created
+
+async def create_orders_idempotent(
+    response: Response,
+    idempotency_key: Optional[str],
+    orders: List[OrderCreate],
+    db: AsyncDB,
+    user_id: int
+) -> List[Order]:
+    # Tabletler zaman aşımında aynı anahtarla tekrar gönderir; sipariş iki kez yazılmaz
+    return await run_idempotent(
+        response,
+        db,
+        idempotency_key,
+        user_id,
+        "create_orders",
+        [order.model_dump(mode="json") for order in orders],
+        lambda complete: db.run_sync(save_orders, orders, user_id, complete)
+    )
+
 @router.post("", response_model=Order)
-def create_order(
+async def create_order(
     order: OrderCreate,
-    db: Session = Depends(get_db),
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncDB = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
-    db_order = OrderModel(
-        table_id=order.table_id,
-        status=OrderStatus.PENDING,
-        total_amount=0
-    )
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
-    
-    total_amount = 0
-    for item in order.items:
-        order_item = OrderItemModel(
-            order_id=db_order.id,
-            menu_item_id=item.menu_item_id,
-            quantity=item.quantity,
-            price=item.price
+    return (await create_orders_idempotent(response, idempotency_key, [order], db, current_user.id))[0]
+
+@router.post("/batch", response_model=List[Order])
+async def create_orders_batch(
+    orders: List[OrderCreate],
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(get_current_user)
+):
+    return await create_orders_idempotent(response, idempotency_key, orders, db, current_user.id)
+
+# İzin verilen durum geçişleri; DELIVERED ve CANCELLED son durumlardır
+ORDER_STATUS_TRANSITIONS = {
+    OrderStatus.PENDING: {OrderStatus.PREPARING, OrderStatus.CANCELLED},
+    OrderStatus.PREPARING: {OrderStatus.READY, OrderStatus.CANCELLED},
+    OrderStatus.READY: {OrderStatus.DELIVERED, OrderStatus.CANCELLED},
+    OrderStatus.DELIVERED: set(),
+    OrderStatus.CANCELLED: set(),
+}
+
+def change_order_status(
+    db: Session,
+    order_id: int,
+    status: OrderStatus,
+    expected_version: Optional[int] = None,
+    complete: Optional[Completion] = None
+) -> Order:
+    order = find_order(db, order_id)
+    if expected_version is not None and order.version != expected_version:
+        raise HTTPException(status_code=409, detail="Order was modified by another request")
+    previous_status = order.status
+    if status == previous_status:
+        unchanged = Order.model_validate(order)
+        if complete is not None:
+            complete(db, unchanged)
+            db.commit()
+        return unchanged
+    if status not in ORDER_STATUS_TRANSITIONS[previous_status]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Cannot change order status from {previous_status.value} to {status.value}"
         )
-        db.add(order_item)
-        total_amount += item.price * item.quantity
-    
-    db_order.total_amount = total_amount
+    order.status = status
+    if not flush_versioned(db):
+        raise HTTPException(status_code=409, detail="Order was modified by another request")
+    # Teslim edilen siparişler rapor özetlerine aynı işlemde yansıtılır
+    apply_status_change(db, order, previous_status)
+    updated = Order.model_validate(order)
+    if complete is not None:
+        complete(db, updated)
     db.commit()
-    db.refresh(db_order)
-    return db_order
+    publish_order_event("order_status_changed", updated)
+    return updated
 
 @router.put("/{order_id}/status", response_model=Order)
-def update_order_status(
+async def update_order_status(
     order_id: int,
     status: OrderStatus,
-    db: Session = Depends(get_db),
+    response: Response,
+    version: Optional[int] = None,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncDB = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     if not current_user.is_admin and not current_user.is_kitchen_staff:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    order = db.query(OrderModel).filter(OrderModel.id == order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    order.status = status
-    db.commit()
-    db.refresh(order)
-    return order 
\ No newline at end of file
+    return await run_idempotent(
+        response,
+        db,
+        idempotency_key,
+        current_user.id,
+        f"update_order_status:{order_id}",
+        [status.value, version],
+        lambda complete: db.run_sync(change_order_status, order_id, status, version, complete)
+    )
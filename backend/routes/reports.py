@@ -0,0 +1,147 @@
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from database import AsyncDB, get_async_db
+from models import (
+    DailySales,
+    HourlySales,
+    MenuItem as MenuItemModel,
+    MenuItemDailySales,
+    TableDailySales,
+)
+from schemas import (
+    DailySalesReport,
+    HourlySalesReport,
+    MenuItemSalesReport,
+    SalesSummary,
+    TableSalesReport,
+)
+from auth import get_token_claims
+
+router = APIRouter(
+    prefix="/reports",
+    tags=["reports"]
+)
+
+# Raporlar yalnızca özet tablolardan okunur; orders/order_items taranmaz
+
+def require_admin(current_user = Depends(get_token_claims)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return current_user
+
+def _in_range(query, model, start: Optional[date], end: Optional[date]):
+    if start:
+        query = query.where(model.day >= start)
+    if end:
+        query = query.where(model.day <= end)
+    return query
+
+def load_daily_sales(db: Session, start: Optional[date], end: Optional[date]) -> List[DailySales]:
+    query = _in_range(select(DailySales), DailySales, start, end)
+    return db.scalars(query.order_by(DailySales.day)).all()
+
+@router.get("/daily", response_model=List[DailySalesReport])
+async def get_daily_sales(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(require_admin)
+):
+    return await db.run_sync(load_daily_sales, start, end)
+
+def load_hourly_sales(db: Session, start: Optional[date], end: Optional[date]) -> List[HourlySales]:
+    query = _in_range(select(HourlySales), HourlySales, start, end)
+    return db.scalars(query.order_by(HourlySales.day, HourlySales.hour)).all()
+
+@router.get("/hourly", response_model=List[HourlySalesReport])
+async def get_hourly_sales(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(require_admin)
+):
+    return await db.run_sync(load_hourly_sales, start, end)
+
+def load_menu_item_sales(db: Session, start: Optional[date], end: Optional[date], limit: int) -> List[MenuItemSalesReport]:
+    revenue = func.sum(MenuItemDailySales.revenue)
+    query = _in_range(
+        select(
+            MenuItemDailySales.menu_item_id,
+            MenuItemModel.name,
+            MenuItemModel.category,
+            func.sum(MenuItemDailySales.quantity).label("quantity"),
+            revenue.label("revenue"),
+        ).outerjoin(MenuItemModel, MenuItemModel.id == MenuItemDailySales.menu_item_id),
+        MenuItemDailySales, start, end
+    )
+    rows = db.execute(
+        query.group_by(MenuItemDailySales.menu_item_id, MenuItemModel.name, MenuItemModel.category)
+        .order_by(revenue.desc())
+        .limit(limit)
+    ).all()
+    return [MenuItemSalesReport(**row._mapping) for row in rows]
+
+@router.get("/menu-items", response_model=List[MenuItemSalesReport])
+async def get_menu_item_sales(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(require_admin)
+):
+    return await db.run_sync(load_menu_item_sales, start, end, limit)
+
+def load_table_sales(db: Session, start: Optional[date], end: Optional[date]) -> List[TableSalesReport]:
+    revenue = func.sum(TableDailySales.revenue)
+    query = _in_range(
+        select(
+            TableDailySales.table_id,
+            func.sum(TableDailySales.order_count).label("order_count"),
+            revenue.label("revenue"),
+        ),
+        TableDailySales, start, end
+    )
+    rows = db.execute(query.group_by(TableDailySales.table_id).order_by(revenue.desc())).all()
+    return [TableSalesReport(**row._mapping) for row in rows]
+
+@router.get("/tables", response_model=List[TableSalesReport])
+async def get_table_sales(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(require_admin)
+):
+    return await db.run_sync(load_table_sales, start, end)
+
+def load_sales_summary(db: Session, start: Optional[date], end: Optional[date]) -> SalesSummary:
+    query = _in_range(
+        select(
+            func.count(DailySales.day),
+            func.coalesce(func.sum(DailySales.order_count), 0),
+            func.coalesce(func.sum(DailySales.item_count), 0),
+            func.coalesce(func.sum(DailySales.revenue), 0),
+        ),
+        DailySales, start, end
+    )
+    days, order_count, item_count, revenue = db.execute(query).one()
+    return SalesSummary(
+        start=start,
+        end=end,
+        days=days,
+        order_count=order_count,
+        item_count=item_count,
+        revenue=revenue,
+        average_order_value=revenue / order_count if order_count else 0,
+    )
+
+@router.get("/summary", response_model=SalesSummary)
+async def get_sales_summary(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(require_admin)
+):
+    return await db.run_sync(load_sales_summary, start, end)
@@ -1,114 +1,248 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
-from models import Table as TableModel
-from schemas import Table, TableCreate, TableUpdate, TableStatus
-from auth import get_current_user
-import qrcode
-from io import BytesIO
-import base64
+from typing import List, Optional, Tuple
+from database import AsyncDB, flush_versioned, get_async_db
+from etags import cache_headers, data_etag, etag_matches, not_modified_response
+from events import table_feed, sse_response
+from floor import get_floor_state, get_turn_times, set_table_status
+from invalidation import invalidation_bus
+from models import Table as TableModel, TableQRCode
+from schemas import Table, TableCreate, TableTurnTime, TableUpdate, TableStatus
+from serialization import dump_json, json_response, table_list_adapter
+from auth import get_current_user, get_token_claims
+from qr_codes import refresh_qr_code
+import threading
 
 router = APIRouter(
     prefix="/tables",
     tags=["tables"]
 )
 
-def generate_qr_code(table_id: str) -> str:
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(f"http://localhost:3000/menu/{table_id}")
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffered = BytesIO()
-    img.save(buffered, format="PNG")
-    return base64.b64encode(buffered.getvalue()).decode()
+def publish_table_event(event_type: str, table: TableModel) -> None:
+    table_feed.publish(event_type, Table.model_validate(table).model_dump(mode="json"))
+    invalidation_bus.publish("tables")
+
+# Son masa listesi; olay imleci değişmediği sürece veritabanına gidilmez.
+# Diğer worker'ların yazmaları table_feed'e reset olayı olarak düştüğü için imleç onlarda da ilerler.
+_snapshot = {"version": -1, "body": b"[]"}
+_snapshot_lock = threading.Lock()
+
+def load_table_snapshot(db: Session) -> dict:
+    version = table_feed.cursor
+    with _snapshot_lock:
+        if _snapshot["version"] != version:
+            # Liste JSON olarak saklanır; sonraki okumalar serileştirme yapmaz
+            body = dump_json(table_list_adapter, db.query(TableModel).all())
+            _snapshot.update(version=version, body=body)
+        return _snapshot
+
+async def get_table_snapshot(db: AsyncDB) -> dict:
+    if _snapshot["version"] == table_feed.cursor:
+        return _snapshot
+    return await db.run_sync(load_table_snapshot)
 
 @router.get("", response_model=List[Table])
-def get_tables(
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+async def get_tables(
+    request: Request,
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(get_token_claims)
 ):
-    return db.query(TableModel).all()
+    etag = data_etag(request, "tables")
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    return json_response((await get_table_snapshot(db))["body"], cache_headers(etag))
 
-@router.get("/{table_id}", response_model=Table)
-def get_table(
-    table_id: int,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+def snapshot_body(snapshot: dict) -> bytes:
+    return b'{"version":%d,"tables":%s}' % (snapshot["version"], snapshot["body"])
+
+@router.get("/snapshot")
+async def get_tables_snapshot(
+    request: Request,
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(get_token_claims)
+):
+    etag = data_etag(request, "tables")
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    return json_response(snapshot_body(await get_table_snapshot(db)), cache_headers(etag))
+
+@router.get("/changes")
+async def get_table_changes(
+    since: int,
+    current_user = Depends(get_token_claims)
+):
+    events = table_feed.since(since)
+    if events is None:
+        raise HTTPException(status_code=410, detail="Version too old, fetch a new snapshot")
+    return {"version": events[-1]["id"] if events else since, "events": events}
+
+@router.get("/stream")
+async def stream_tables(
+    request: Request,
+    cursor: Optional[int] = None,
+    current_user = Depends(get_token_claims)
+):
+    return sse_response(table_feed, request, cursor)
+
+@router.get("/free", response_model=List[Table])
+async def get_free_tables(
+    min_capacity: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(get_token_claims)
 ):
+    # Karşılama: N kişilik grup için boş masalar, en küçük uygun masa önce
+    floor = await get_floor_state(db)
+    return json_response(table_list_adapter.dump_json(floor.free_tables(min_capacity, limit)))
+
+@router.get("/turn-times", response_model=List[TableTurnTime])
+async def get_table_turn_times(
+    days: Optional[int] = Query(None, ge=1, le=365),
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(get_token_claims)
+):
+    return await get_turn_times(db, days)
+
+def find_table(db: Session, table_id: int) -> TableModel:
     table = db.query(TableModel).filter(TableModel.id == table_id).first()
     if not table:
         raise HTTPException(status_code=404, detail="Table not found")
     return table
 
+@router.get("/{table_id}", response_model=Table)
+async def get_table(
+    table_id: int,
+    db: AsyncDB = Depends(get_async_db),
+    current_user = Depends(get_token_claims)
+):
+    return await db.run_sync(find_table, table_id)
+
+def load_table_qr_code(db: Session, table_id: int) -> Tuple[bytes, str]:
+    # Kodlar masa oluşturulurken ve açılışta (render_missing_qr_codes) üretilir; burada yalnızca okunur
+    qr_image = db.query(TableQRCode).filter(TableQRCode.table_id == table_id).first()
+    if qr_image is None:
+        raise HTTPException(status_code=404, detail="QR code not found")
+    return qr_image.png, qr_image.content_hash
+
+@router.get("/{table_id}/qr.png")
+async def get_table_qr_code(
+    table_id: int,
+    request: Request,
+    db: AsyncDB = Depends(get_async_db)
+):
+    # Basılı QR sayfalarında <img> ile kullanıldığı için kimlik doğrulama istemez
+    png, content_hash = await db.run_sync(load_table_qr_code, table_id)
+    headers = {
+        "ETag": f'"{content_hash}"',
+        "Cache-Control": "public, max-age=86400",
+    }
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=png, media_type="image/png", headers=headers)
+
+def add_table(db: Session, table: TableCreate) -> TableModel:
+    values = table.dict()
+    status = values.pop("status")
+    db_table = TableModel(**values, status=TableStatus.AVAILABLE)
+    db.add(db_table)
+    db.flush()
+    if status != TableStatus.AVAILABLE:
+        set_table_status(db, db_table, status)
+    refresh_qr_code(db_table)
+    db.commit()
+    db.refresh(db_table)
+    publish_table_event("table_created", db_table)
+    return db_table
+
 @router.post("", response_model=Table)
-def create_table(
+async def create_table(
     table: TableCreate,
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    db_table = TableModel(**table.dict())
-    db.add(db_table)
+    return await db.run_sync(add_table, table)
+
+def change_table(db: Session, table_id: int, table: TableUpdate) -> TableModel:
+    db_table = find_table(db, table_id)
+    values = table.dict(exclude_unset=True)
+    status = values.pop("status", None)
+    for key, value in values.items():
+        setattr(db_table, key, value)
+    if status is not None and status != db_table.status:
+        set_table_status(db, db_table, status)
+    if not flush_versioned(db):
+        raise HTTPException(status_code=409, detail="Table was modified by another request")
     db.commit()
     db.refresh(db_table)
+    publish_table_event("table_updated", db_table)
     return db_table
 
 @router.put("/{table_id}", response_model=Table)
-def update_table(
+async def update_table(
     table_id: int,
     table: TableUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    db_table = db.query(TableModel).filter(TableModel.id == table_id).first()
-    if not db_table:
-        raise HTTPException(status_code=404, detail="Table not found")
-    
-    for key, value in table.dict(exclude_unset=True).items():
-        setattr(db_table, key, value)
-    
+    return await db.run_sync(change_table, table_id, table)
+
+def remove_table(db: Session, table_id: int) -> None:
+    db_table = find_table(db, table_id)
+    # Oturum geçmişi ilişki üzerinden masayla birlikte silinir (bkz. Table.sessions)
+    db.delete(db_table)
     db.commit()
-    db.refresh(db_table)
-    return db_table
+    table_feed.publish("table_deleted", {"id": table_id})
+    invalidation_bus.publish("tables")
 
 @router.delete("/{table_id}")
-def delete_table(
+async def delete_table(
     table_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncDB = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    db_table = db.query(TableModel).filter(TableModel.id == table_id).first()
-    if not db_table:
-        raise HTTPException(status_code=404, detail="Table not found")
-    
-    db.delete(db_table)
-    db.commit()
+    await db.run_sync(remove_table, table_id)
     return {"message": "Table deleted"}
 
+def change_table_status(
+    db: Session,
+    table_id: int,
+    status: TableStatus,
+    expected_version: Optional[int] = None,
+    party_size: Optional[int] = None
+) -> TableModel:
+    db_table = find_table(db, table_id)
+    if expected_version is not None and db_table.version != expected_version:
+        raise HTTPException(status_code=409, detail="Table was modified by another request")
+    if db_table.status == status and (party_size is None or party_size == db_table.party_size):
+        return db_table
+    # Oturum geçmişi (oturma/kalkma zamanı) durum değişikliğiyle aynı işlemde yazılır
+    set_table_status(db, db_table, status, party_size)
+    if not flush_versioned(db):
+        raise HTTPException(status_code=409, detail="Table was modified by another request")
+    db.commit()
+    db.refresh(db_table)
+    publish_table_event("table_status_changed", db_table)
+    return db_table
+
 @router.put("/{table_id}/status", response_model=Table)
-def update_table_status(
+async def update_table_status(
     table_id: int,
     status: TableStatus,
-    db: Session = Depends(get_db),
+    version: Optional[int] = None,
+    party_size: Optional[int] = Query(None, ge=1),
+    db: AsyncDB = Depends(get_async_db),
     current_user = Depends(get_current_user)
 ):
     if not current_user.is_admin and not current_user.is_waiter:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    db_table = db.query(TableModel).filter(TableModel.id == table_id).first()
-    if not db_table:
-        raise HTTPException(status_code=404, detail="Table not found")
-    
-    db_table.status = status
-    db.commit()
-    db.refresh(db_table)
-    return db_table 
\ No newline at end of file
+    return await db.run_sync(change_table_status, table_id, status, version, party_size)
\ No newline at end of file
@@ -2,53 +2,73 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 
-from database import get_db
+from database import AsyncDB, get_async_db
 from models import User
-from schemas import UserResponse, UserCreate, UserUpdate
-from auth import get_current_user, get_password_hash
+from schemas import TokenClaims, UserResponse, UserCreate, UserUpdate
+from auth import (
+    get_current_user,
+    get_token_claims,
+    record_deleted_user,
+    revoke_deleted_user_tokens,
+    revoke_user_tokens,
+    token_revocation_stats,
+    get_password_hash_async,
+    invalidate_cached_user,
+    password_pool_stats,
+    user_cache,
+)
 
 router = APIRouter(
     prefix="/users",
     tags=["users"]
 )
 
+def list_users(db: Session) -> List[User]:
+    return db.query(User).all()
+
 @router.get("", response_model=List[UserResponse])
-def get_users(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_users(
+    db: AsyncDB = Depends(get_async_db),
+    current_user: TokenClaims = Depends(get_token_claims)
 ):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
-    return db.query(User).all()
+    return await db.run_sync(list_users)
 
-@router.get("/{user_id}", response_model=UserResponse)
-def get_user(
-    user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    if not current_user.is_admin and current_user.id != user_id:
+@router.get("/cache/stats")
+async def get_user_cache_stats(current_user: TokenClaims = Depends(get_token_claims)):
+    if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
-    
+    return dict(user_cache.stats(), token_revocations=token_revocation_stats())
+
+@router.get("/password-pool/stats")
+async def get_password_pool_stats(current_user: TokenClaims = Depends(get_token_claims)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return password_pool_stats()
+
+def find_user(db: Session, user_id: int) -> User:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
-@router.post("", response_model=UserResponse)
-def create_user(
-    user: UserCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+@router.get("/{user_id}", response_model=UserResponse)
+async def get_user(
+    user_id: int,
+    db: AsyncDB = Depends(get_async_db),
+    current_user: TokenClaims = Depends(get_token_claims)
 ):
-    if not current_user.is_admin:
+    if not current_user.is_admin and current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
+    return await db.run_sync(find_user, user_id)
+
+def add_user(db: Session, user: UserCreate, hashed_password: str) -> User:
     db_user = db.query(User).filter(User.email == user.email).first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
     db_user = User(
         email=user.email,
         hashed_password=hashed_password,
@@ -60,42 +80,71 @@ def create_user(
     db.refresh(db_user)
     return db_user
 
-@router.put("/{user_id}", response_model=UserResponse)
-def update_user(
-    user_id: int,
-    user: UserUpdate,
-    db: Session = Depends(get_db),
+@router.post("", response_model=UserResponse)
+async def create_user(
+    user: UserCreate,
+    db: AsyncDB = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    if not current_user.is_admin and current_user.id != user_id:
+    if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    db_user = db.query(User).filter(User.id == user_id).first()
-    if not db_user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    for key, value in user.dict(exclude_unset=True).items():
-        if key == "password" and value:
-            value = get_password_hash(value)
+    hashed_password = await get_password_hash_async(user.password)
+    return await db.run_sync(add_user, user, hashed_password)
+
+# Bu alanlar değişince kullanıcının mevcut token'ları geçersiz olur
+TOKEN_FIELDS = ("email", "hashed_password", "role", "is_active")
+
+def change_user(db: Session, user_id: int, values: dict) -> User:
+    db_user = find_user(db, user_id)
+    previous_email = db_user.email
+    revoke = any(key in TOKEN_FIELDS and getattr(db_user, key) != value for key, value in values.items())
+    for key, value in values.items():
         setattr(db_user, key, value)
+    if revoke:
+        db_user.token_version += 1
     
     db.commit()
     db.refresh(db_user)
+    invalidate_cached_user(previous_email)
+    invalidate_cached_user(db_user.email)
+    if revoke:
+        revoke_user_tokens(db_user.id, db_user.token_version if db_user.is_active else None)
     return db_user
 
-@router.delete("/{user_id}")
-def delete_user(
+@router.put("/{user_id}", response_model=UserResponse)
+async def update_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    user: UserUpdate,
+    db: AsyncDB = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    if not current_user.is_admin:
+    if not current_user.is_admin and current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    db_user = db.query(User).filter(User.id == user_id).first()
-    if not db_user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
+    values = user.dict(exclude_unset=True)
+    password = values.pop("password", None)
+    if password:
+        values["hashed_password"] = await get_password_hash_async(password)
+    return await db.run_sync(change_user, user_id, values)
+
+def remove_user(db: Session, user_id: int) -> None:
+    db_user = find_user(db, user_id)
+    email = db_user.email
     db.delete(db_user)
+    revoked_at = record_deleted_user(db, user_id)
     db.commit()
-    return {"message": "User deleted"} 
\ No newline at end of file
+    invalidate_cached_user(email)
+    revoke_deleted_user_tokens(user_id, revoked_at)
+
+@router.delete("/{user_id}")
+async def delete_user(
+    user_id: int,
+    db: AsyncDB = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    await db.run_sync(remove_user, user_id)
+    return {"message": "User deleted"}
\ No newline at end of file
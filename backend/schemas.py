@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 
 class UserRole(str, Enum):
@@ -49,7 +49,21 @@ class UserUpdate(BaseModel):
     role: Optional[UserRole] = None
     is_active: Optional[bool] = None
 
-class UserResponse(BaseModel):
+class RoleChecks:
+    # UserResponse ve TokenClaims için ortak rol kontrolleri (role alanı gerektirir)
+    @property
+    def is_admin(self) -> bool:
+        return self.role == UserRole.ADMIN
+
+    @property
+    def is_waiter(self) -> bool:
+        return self.role == UserRole.WAITER
+
+    @property
+    def is_kitchen_staff(self) -> bool:
+        return self.role == UserRole.KITCHEN
+
+class UserResponse(RoleChecks, BaseModel):
     id: int
     email: str
     full_name: str
@@ -68,21 +82,17 @@ class UserResponse(BaseModel):
             }
         }
 
-    @property
-    def is_admin(self) -> bool:
-        return self.role == UserRole.ADMIN
-
-    @property
-    def is_waiter(self) -> bool:
-        return self.role == UserRole.WAITER
-
-    @property
-    def is_kitchen_staff(self) -> bool:
-        return self.role == UserRole.KITCHEN
-
 class User(UserResponse):
     pass
 
+class TokenClaims(RoleChecks, BaseModel):
+    # İmzası doğrulanmış token içeriği; okuma endpoint'leri kullanıcı satırı yüklemeden yetkilendirir
+    id: int
+    email: str
+    role: UserRole
+    token_version: int = 0
+    issued_at: int = 0
+
 class MenuItemBase(BaseModel):
     name: str
     description: str
@@ -122,17 +132,29 @@ class TableUpdate(BaseModel):
 class Table(TableBase):
     id: int
     qr_code: Optional[str] = None
+    version: int = 1
+    seated_at: Optional[datetime] = None
+    party_size: Optional[int] = None
 
     class Config:
         from_attributes = True
 
+class TableTurnTime(BaseModel):
+    table_id: int
+    number: Optional[int] = None
+    sessions: int
+    average_turn_minutes: Optional[float] = None
+    # Masa şu an doluysa oturumun süresi
+    occupied_minutes: Optional[float] = None
+
 class OrderItemBase(BaseModel):
     menu_item_id: int
     quantity: int
     price: float
 
 class OrderItemCreate(OrderItemBase):
-    pass
+    # Fiyat sunucuda menüden alınır; istemcinin gönderdiği değer yok sayılır
+    price: Optional[float] = None
 
 class OrderItem(OrderItemBase):
     id: int
@@ -147,7 +169,8 @@ class OrderBase(BaseModel):
     total_amount: float = 0
 
 class OrderCreate(OrderBase):
-    items: List[OrderItemCreate]
+    # Kalemsiz sipariş mutfağa boş fiş ve 0 TL'lik kayıt olarak düşerdi
+    items: List[OrderItemCreate] = Field(min_length=1)
 
 class OrderUpdate(BaseModel):
     status: Optional[OrderStatus] = None
@@ -156,6 +179,70 @@ class OrderUpdate(BaseModel):
 class Order(OrderBase):
     id: int
     items: List[OrderItem]
+    created_at: Optional[datetime] = None
+    version: int = 1
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class KitchenTicketItem(BaseModel):
+    menu_item_id: int
+    name: str
+    quantity: int
+
+class KitchenTicket(BaseModel):
+    order_id: int
+    table_id: int
+    status: OrderStatus
+    created_at: Optional[datetime] = None
+    age_seconds: int
+    priority: str
+    items: List[KitchenTicketItem]
+
+class KitchenStation(BaseModel):
+    category: Optional[Category] = None
+    tickets: List[KitchenTicket]
+
+class KitchenQueue(BaseModel):
+    cursor: int
+    active_orders: int
+    stations: List[KitchenStation]
+
+class DailySalesReport(BaseModel):
+    day: date
+    order_count: int
+    item_count: int
+    revenue: float
+
+    class Config:
+        from_attributes = True
+
+class HourlySalesReport(BaseModel):
+    day: date
+    hour: int
+    order_count: int
+    revenue: float
+
+    class Config:
+        from_attributes = True
+
+class MenuItemSalesReport(BaseModel):
+    menu_item_id: int
+    name: Optional[str] = None
+    category: Optional[Category] = None
+    quantity: int
+    revenue: float
+
+class TableSalesReport(BaseModel):
+    table_id: int
+    order_count: int
+    revenue: float
+
+class SalesSummary(BaseModel):
+    start: Optional[date] = None
+    end: Optional[date] = None
+    days: int
+    order_count: int
+    item_count: int
+    revenue: float
+    average_order_value: float
@@ -0,0 +1,23 @@
+from typing import Any, Dict, List, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from schemas import MenuItem, Order, Table
+
+# Adaptörler modül yüklenirken bir kez derlenir. Liste endpoint'leri bunlarla
+# doğrudan JSON baytı üretir; FastAPI'nin response_model doğrulaması, dict'e
+# dönüştürme ve json.dumps adımları atlanır.
+order_list_adapter = TypeAdapter(List[Order])
+table_list_adapter = TypeAdapter(List[Table])
+menu_item_list_adapter = TypeAdapter(List[MenuItem])
+
+
+def dump_json(adapter: TypeAdapter, rows: Any) -> bytes:
+    """ORM nesnelerini tek geçişte şemaya göre okuyup JSON baytlarına çevirir."""
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+def json_response(body: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    # Hazır gövde olduğu gibi gönderilir; endpoint'teki response_model yalnızca OpenAPI için kalır
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Uygulama modülleri veritabanı motorunu import sırasında kurar; ayarlar önce yapılmalı
+_tmp_dir = tempfile.mkdtemp(prefix="restaurant-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'test.db')}"
+os.environ.setdefault("DB_ASYNC", "false")
+os.environ.setdefault("CACHE_BUS", "local")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    import init_db
+    init_db.init_db()
+    import main
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    response = client.post("/token", data={"username": "admin@restaurant.com", "password": "admin123"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def menu_item(client, admin_headers):
+    response = client.post("/menu/items", headers=admin_headers, json={
+        "name": "Mercimek Çorbası",
+        "description": "Günün çorbası",
+        "price": 45.0,
+        "category": "main_course",
+        "is_available": True,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.fixture
+def table(client, admin_headers):
+    number = 1 + max((table["number"] for table in client.get("/tables", headers=admin_headers).json()), default=0)
+    response = client.post("/tables", headers=admin_headers, json={"number": number, "capacity": 4})
+    assert response.status_code == 200, response.text
+    return response.json()
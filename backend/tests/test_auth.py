@@ -0,0 +1,43 @@
+import uuid
+
+import auth
+from database import SessionLocal
+
+
+def register_and_login(client, admin_headers):
+    email = f"garson-{uuid.uuid4().hex[:8]}@restaurant.com"
+    response = client.post("/users", headers=admin_headers, json={
+        "email": email, "full_name": "Garson", "role": "waiter", "password": "secret123",
+    })
+    assert response.status_code == 200, response.text
+    token = client.post("/token", data={"username": email, "password": "secret123"}).json()["access_token"]
+    return response.json()["id"], {"Authorization": f"Bearer {token}"}
+
+
+def reload_revocations():
+    # Yeniden başlatmayı taklit eder: bellekteki iptaller silinip veritabanından yüklenir
+    with auth._token_floors_lock:
+        auth._token_floors.clear()
+        auth._deleted_users.clear()
+    with SessionLocal() as db:
+        auth.load_token_revocations(db)
+
+
+def test_deleted_user_token_stays_revoked_after_restart(client, admin_headers):
+    user_id, headers = register_and_login(client, admin_headers)
+    assert client.get("/orders", headers=headers).status_code == 200
+
+    assert client.delete(f"/users/{user_id}", headers=admin_headers).status_code == 200
+    assert client.get("/orders", headers=headers).status_code == 401
+
+    reload_revocations()
+    assert client.get("/orders", headers=headers).status_code == 401
+    assert client.get("/orders", headers=admin_headers).status_code == 200
+
+
+def test_deactivated_user_token_stays_revoked_after_restart(client, admin_headers):
+    user_id, headers = register_and_login(client, admin_headers)
+
+    assert client.put(f"/users/{user_id}", headers=admin_headers, json={"is_active": False}).status_code == 200
+    reload_revocations()
+    assert client.get("/orders", headers=headers).status_code == 401
@@ -0,0 +1,25 @@
+def test_compressible_responses_vary_on_accept_encoding(client, admin_headers, menu_item):
+    # Küçük gövde: sıkıştırılmaz ama Vary yine de gönderilir
+    small = client.get(f"/menu/items/{menu_item['id']}", headers={**admin_headers, "Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert "Accept-Encoding" in small.headers["vary"]
+
+    identity = client.get("/orders", headers={**admin_headers, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert "Accept-Encoding" in identity.headers["vary"]
+
+
+def test_large_responses_are_compressed(client, admin_headers, menu_item):
+    response = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"].count("Accept-Encoding") == 1
+
+
+def test_active_orders_not_modified_keeps_feed_cursor(client, admin_headers):
+    first = client.get("/orders/active", headers=admin_headers)
+    assert first.status_code == 200
+
+    response = client.get("/orders/active", headers={**admin_headers, "If-None-Match": first.headers["etag"]})
+    assert response.status_code == 304
+    assert response.headers["x-feed-cursor"] == first.headers["x-feed-cursor"]
+    assert "Accept-Encoding" in response.headers["vary"]
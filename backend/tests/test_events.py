@@ -0,0 +1,75 @@
+import asyncio
+
+from events import RESET_EVENT, EventFeed, follow_remote
+from invalidation import SQLiteInvalidationBus
+from kitchen_queue import KitchenQueue
+
+
+def test_since_returns_events_after_own_cursor():
+    feed = EventFeed()
+    start = feed.cursor
+    first = feed.publish("order_created", {"id": 1})
+    second = feed.publish("order_created", {"id": 2})
+
+    assert feed.since(start) == [first, second]
+    assert feed.since(first["id"]) == [second]
+    assert feed.since(second["id"]) == []
+
+
+def test_since_resets_cursor_from_another_process():
+    # Her akış (worker) kendi dönemiyle başlar; diğerinin imleci sıfırlama gerektirir
+    feed, other = EventFeed(), EventFeed()
+    feed.publish("order_created", {"id": 1})
+    other.publish("order_created", {"id": 1})
+
+    assert feed.since(other.cursor) is None
+    assert feed.since(0) is None
+    assert feed.since(feed.cursor + 1) is None
+
+
+def test_since_reports_gap_when_events_were_dropped():
+    feed = EventFeed(maxlen=2)
+    start = feed.cursor
+    for index in range(3):
+        feed.publish("order_created", {"id": index})
+
+    assert feed.since(start) is None
+
+
+def test_remote_write_reaches_local_subscriber(tmp_path):
+    # İki worker aynı veri yolunu paylaşır; B'deki sipariş A'daki SSE abonesine reset olarak ulaşır
+    path = str(tmp_path / "bus.db")
+    bus_a = SQLiteInvalidationBus(path, poll_seconds=3600)
+    bus_b = SQLiteInvalidationBus(path, poll_seconds=3600)
+    feed_a, feed_b = EventFeed(), EventFeed()
+    follow_remote(feed_a, "orders", bus_a)
+    follow_remote(feed_b, "orders", bus_b)
+    start_b = feed_b.cursor
+
+    async def receive():
+        events = feed_a.subscribe(feed_a.cursor)
+        pending = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0)
+        bus_b.publish("orders", "1")
+        bus_b.flush()
+        assert bus_a.poll() == 1
+        event = await asyncio.wait_for(pending, timeout=1)
+        await events.aclose()
+        return event
+
+    event = asyncio.run(receive())
+
+    assert event["type"] == RESET_EVENT
+    # Yazan worker kendi akışına reset eklemez; olayı kendisi yayınlar
+    assert feed_b.cursor == start_b
+
+
+def test_projection_reloads_after_remote_reset():
+    feed = EventFeed()
+    queue = KitchenQueue(feed)
+    queue._cursor = feed.cursor
+    assert queue.catch_up()
+
+    feed.publish(RESET_EVENT, {})
+    assert not queue.catch_up()
+    assert queue.cursor is None
@@ -0,0 +1,94 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import idempotency
+from auth import get_user_by_email
+from database import SessionLocal
+from idempotency import IDEMPOTENCY_PENDING_SECONDS
+from models import IdempotencyRecord
+
+
+def order_payload(table, menu_item, quantity=2):
+    return {"table_id": table["id"], "items": [{"menu_item_id": menu_item["id"], "quantity": quantity}]}
+
+
+def test_idempotent_create_replays_first_response(client, admin_headers, table, menu_item):
+    headers = {**admin_headers, "Idempotency-Key": str(uuid.uuid4())}
+    payload = order_payload(table, menu_item)
+
+    first = client.post("/orders", headers=headers, json=payload)
+    second = client.post("/orders", headers=headers, json=payload)
+
+    assert first.status_code == second.status_code == 200
+    assert second.json()["id"] == first.json()["id"]
+    assert second.headers.get("Idempotent-Replayed") == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    orders = client.get("/orders", headers=admin_headers, params={"table_id": table["id"]}).json()
+    assert [order["id"] for order in orders] == [first.json()["id"]]
+
+
+def test_idempotency_key_reused_with_different_payload(client, admin_headers, table, menu_item):
+    headers = {**admin_headers, "Idempotency-Key": str(uuid.uuid4())}
+
+    assert client.post("/orders", headers=headers, json=order_payload(table, menu_item)).status_code == 200
+    response = client.post("/orders", headers=headers, json=order_payload(table, menu_item, quantity=5))
+    assert response.status_code == 422
+
+
+def test_failed_request_does_not_burn_idempotency_key(client, admin_headers, table, menu_item):
+    headers = {**admin_headers, "Idempotency-Key": str(uuid.uuid4())}
+    payload = order_payload(table, menu_item)
+
+    client.put(f"/menu/items/{menu_item['id']}", headers=admin_headers, json={"is_available": False})
+    assert client.post("/orders", headers=headers, json=payload).status_code == 400
+    client.put(f"/menu/items/{menu_item['id']}", headers=admin_headers, json={"is_available": True})
+
+    response = client.post("/orders", headers=headers, json=payload)
+    assert response.status_code == 200
+    assert "Idempotent-Replayed" not in response.headers
+
+
+def test_abandoned_idempotency_key_is_taken_over(client, admin_headers, table, menu_item):
+    # Yanıt yazılmadan çöken bir worker'ın bıraktığı kayıt devralınır
+    key = str(uuid.uuid4())
+    payload = order_payload(table, menu_item)
+    with SessionLocal() as db:
+        db.add(IdempotencyRecord(
+            user_id=get_user_by_email(db, "admin@restaurant.com").id,
+            scope="create_orders",
+            key=key,
+            fingerprint="crashed",
+            created_at=datetime.now(timezone.utc) - timedelta(seconds=IDEMPOTENCY_PENDING_SECONDS + 1),
+        ))
+        db.commit()
+
+    response = client.post("/orders", headers={**admin_headers, "Idempotency-Key": key}, json=payload)
+
+    assert response.status_code == 200, response.text
+    assert "Idempotent-Replayed" not in response.headers
+    replay = client.post("/orders", headers={**admin_headers, "Idempotency-Key": key}, json=payload)
+    assert replay.json()["id"] == response.json()["id"]
+    assert replay.headers.get("Idempotent-Replayed") == "true"
+
+
+def test_failed_completion_does_not_keep_the_order(client, admin_headers, table, menu_item, monkeypatch):
+    # Yanıt yazılamazsa sipariş de yazılmaz; aynı anahtarla tekrar deneme tek sipariş oluşturur
+    headers = {**admin_headers, "Idempotency-Key": str(uuid.uuid4())}
+    payload = order_payload(table, menu_item)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("response could not be stored")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(idempotency, "complete_key", fail)
+        with pytest.raises(RuntimeError):
+            client.post("/orders", headers=headers, json=payload)
+    assert client.get("/orders", headers=admin_headers, params={"table_id": table["id"]}).json() == []
+
+    response = client.post("/orders", headers=headers, json=payload)
+    assert response.status_code == 200, response.text
+    assert "Idempotent-Replayed" not in response.headers
+    orders = client.get("/orders", headers=admin_headers, params={"table_id": table["id"]}).json()
+    assert [order["id"] for order in orders] == [response.json()["id"]]
@@ -0,0 +1,23 @@
+import logging
+
+import menu_search
+
+
+def test_search_tolerates_typos(client, admin_headers, menu_item):
+    response = client.get("/menu/search", headers=admin_headers, params={"q": "mercimk corba"})
+
+    assert response.status_code == 200
+    assert menu_item["id"] in [item["id"] for item in response.json()]
+
+
+def test_search_falls_back_to_sql_when_index_cannot_sync(client, admin_headers, menu_item, monkeypatch, caplog):
+    # Menü her okumada yeniden değişiyormuş gibi: eşitleme hiç tamamlanmaz
+    monkeypatch.setattr(menu_search.menu_search, "sync", lambda items, generation: None)
+    menu_search.menu_search.invalidate()
+
+    with caplog.at_level(logging.WARNING, logger="menu_search"):
+        response = client.get("/menu/search", headers=admin_headers, params={"q": "Mercimek"})
+
+    assert response.status_code == 200
+    assert menu_item["id"] in [item["id"] for item in response.json()]
+    assert "using SQL search" in caplog.text
@@ -0,0 +1,26 @@
+import logging
+
+import metrics
+
+
+def test_metrics_require_admin_or_metrics_token(client, admin_headers, monkeypatch):
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer invalid"}).status_code == 401
+    assert client.get("/metrics", headers=admin_headers).status_code == 200
+
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "scrape-secret")
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert "http_requests_total" in response.text
+
+
+def test_login_uses_password_threshold(client, monkeypatch, caplog):
+    # Şifre doğrulaması bilerek yavaştır; genel eşiği aşması yavaş istek sayılmaz
+    monkeypatch.setattr(metrics, "SLOW_REQUEST_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="metrics"):
+        client.post("/token", data={"username": "admin@restaurant.com", "password": "admin123"})
+        client.get("/")
+
+    slow = [record.getMessage() for record in caplog.records if record.getMessage().startswith("Slow request")]
+    assert len(slow) == 1
+    assert slow[0].startswith("Slow request GET /")
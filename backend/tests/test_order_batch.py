@@ -0,0 +1,14 @@
+def order_payload(table, menu_item, quantity=2):
+    return {"table_id": table["id"], "items": [{"menu_item_id": menu_item["id"], "quantity": quantity}]}
+
+
+def test_batch_is_rejected_as_a_whole(client, admin_headers, table, menu_item):
+    before = len(client.get("/orders", headers=admin_headers, params={"table_id": table["id"]}).json())
+    response = client.post("/orders/batch", headers=admin_headers, json=[
+        order_payload(table, menu_item),
+        {"table_id": table["id"], "items": [{"menu_item_id": 999999, "quantity": 1}]},
+    ])
+
+    assert response.status_code == 400
+    after = len(client.get("/orders", headers=admin_headers, params={"table_id": table["id"]}).json())
+    assert after == before
@@ -0,0 +1,42 @@
+def order_payload(table, menu_item, quantity=2):
+    return {"table_id": table["id"], "items": [{"menu_item_id": menu_item["id"], "quantity": quantity}]}
+
+
+def test_create_order_prices_items_from_menu(client, admin_headers, table, menu_item):
+    payload = order_payload(table, menu_item, quantity=3)
+    payload["items"][0]["price"] = 0.01
+    payload["total_amount"] = 0.01
+
+    response = client.post("/orders", headers=admin_headers, json=payload)
+
+    assert response.status_code == 200, response.text
+    order = response.json()
+    assert order["total_amount"] == menu_item["price"] * 3
+    assert order["items"][0]["price"] == menu_item["price"]
+
+
+def test_create_order_rejects_unknown_menu_item(client, admin_headers, table):
+    response = client.post("/orders", headers=admin_headers, json={
+        "table_id": table["id"], "items": [{"menu_item_id": 999999, "quantity": 1}],
+    })
+    assert response.status_code == 400
+
+
+def test_create_order_rejects_unavailable_menu_item(client, admin_headers, table, menu_item):
+    client.put(f"/menu/items/{menu_item['id']}", headers=admin_headers, json={"is_available": False})
+
+    response = client.post("/orders", headers=admin_headers, json=order_payload(table, menu_item))
+    assert response.status_code == 400
+
+
+def test_create_order_rejects_non_positive_quantity(client, admin_headers, table, menu_item):
+    response = client.post("/orders", headers=admin_headers, json=order_payload(table, menu_item, quantity=0))
+    assert response.status_code == 400
+
+
+def test_create_order_rejects_empty_items(client, admin_headers, table):
+    response = client.post("/orders", headers=admin_headers, json={"table_id": table["id"], "items": []})
+    assert response.status_code == 422
+
+    response = client.post("/orders/batch", headers=admin_headers, json=[{"table_id": table["id"], "items": []}])
+    assert response.status_code == 422
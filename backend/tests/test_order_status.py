@@ -0,0 +1,43 @@
+def order_payload(table, menu_item, quantity=2):
+    return {"table_id": table["id"], "items": [{"menu_item_id": menu_item["id"], "quantity": quantity}]}
+
+
+def create_order(client, headers, table, menu_item):
+    response = client.post("/orders", headers=headers, json=order_payload(table, menu_item))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_status_follows_allowed_transitions(client, admin_headers, table, menu_item):
+    order = create_order(client, admin_headers, table, menu_item)
+
+    for status in ("preparing", "ready", "delivered"):
+        response = client.put(f"/orders/{order['id']}/status", headers=admin_headers, params={"status": status})
+        assert response.status_code == 200, response.text
+        assert response.json()["status"] == status
+
+
+def test_invalid_status_transition_conflicts(client, admin_headers, table, menu_item):
+    order = create_order(client, admin_headers, table, menu_item)
+
+    response = client.put(f"/orders/{order['id']}/status", headers=admin_headers, params={"status": "delivered"})
+    assert response.status_code == 409
+
+    client.put(f"/orders/{order['id']}/status", headers=admin_headers, params={"status": "cancelled"})
+    response = client.put(f"/orders/{order['id']}/status", headers=admin_headers, params={"status": "preparing"})
+    assert response.status_code == 409
+
+
+def test_stale_version_conflicts(client, admin_headers, table, menu_item):
+    order = create_order(client, admin_headers, table, menu_item)
+
+    response = client.put(f"/orders/{order['id']}/status", headers=admin_headers, params={
+        "status": "preparing", "version": order["version"],
+    })
+    assert response.status_code == 200, response.text
+    assert response.json()["version"] == order["version"] + 1
+
+    response = client.put(f"/orders/{order['id']}/status", headers=admin_headers, params={
+        "status": "cancelled", "version": order["version"],
+    })
+    assert response.status_code == 409
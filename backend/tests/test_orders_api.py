@@ -0,0 +1,22 @@
+def order_payload(table, menu_item, quantity=2):
+    return {"table_id": table["id"], "items": [{"menu_item_id": menu_item["id"], "quantity": quantity}]}
+
+
+def create_order(client, headers, table, menu_item):
+    response = client.post("/orders", headers=headers, json=order_payload(table, menu_item))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_legacy_orders_route_is_paginated(client, admin_headers, table, menu_item):
+    for _ in range(3):
+        create_order(client, admin_headers, table, menu_item)
+
+    first = client.get("/orders/", headers=admin_headers, params={"table_id": table["id"], "limit": 2})
+    assert first.status_code == 200
+    assert len(first.json()) == 2
+    rest = client.get("/orders/", headers=admin_headers, params={
+        "table_id": table["id"], "limit": 2, "cursor": first.headers["X-Next-Cursor"],
+    })
+    assert len(rest.json()) == 1
+    assert client.get("/orders/", headers=admin_headers, params={"limit": 1000}).status_code == 422
@@ -0,0 +1,128 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+from menu_cache import menu_cache
+from routes.orders import find_order, list_orders, save_orders
+from schemas import Category, OrderCreate, OrderItemCreate
+
+
+class StatementCounter:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def reset(self) -> None:
+        self.statements = []
+
+
+@pytest.fixture
+def db():
+    # Her test kendi bellek içi veritabanını kullanır; uygulamanın motoruna dokunulmaz
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        models.User(email="garson@restaurant.com", hashed_password="x", full_name="Garson"),
+        models.Table(number=1, capacity=4),
+        models.Table(number=2, capacity=2),
+        models.MenuItem(name="Lahmacun", description="", price=60.0, category=Category.MAIN_COURSE),
+        models.MenuItem(name="Ayran", description="", price=20.0, category=Category.BEVERAGE),
+    ])
+    session.commit()
+    # Menü önbelleği süreç genelinde; bu veritabanından yeniden doldurulur
+    menu_cache.invalidate()
+    menu_cache.items(session)
+    yield session
+    session.close()
+    menu_cache.invalidate()
+    engine.dispose()
+
+
+@pytest.fixture
+def counter(db):
+    statements = StatementCounter()
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", statements)
+    yield statements
+    event.remove(engine, "before_cursor_execute", statements)
+
+
+def make_orders(count: int, items_per_order: int = 2):
+    return [
+        OrderCreate(
+            table_id=1 + index % 2,
+            items=[OrderItemCreate(menu_item_id=1 + item % 2, quantity=1 + item) for item in range(items_per_order)],
+        )
+        for index in range(count)
+    ]
+
+
+@pytest.mark.parametrize("count", [1, 10])
+def test_save_orders_uses_fixed_number_of_statements(db, counter, count):
+    created = save_orders(db, make_orders(count), user_id=1)
+
+    # Açık masa oturumları + siparişler INSERT + kalemler INSERT
+    assert counter.count == 3, counter.statements
+    assert len(created) == count
+    assert all(len(order.items) == 2 for order in created)
+    assert created[0].total_amount == 60.0 * 1 + 20.0 * 2
+
+
+@pytest.mark.parametrize("count", [1, 25])
+def test_list_orders_uses_fixed_number_of_statements(db, counter, count):
+    save_orders(db, make_orders(count), user_id=1)
+    db.expire_all()
+    counter.reset()
+
+    orders = list_orders(db, limit=100)
+    assert all(len(order.items) == 2 for order in orders)
+
+    # Siparişler + kalemler için tek IN sorgusu
+    assert counter.count == 2, counter.statements
+    assert len(orders) == count
+
+
+def test_list_orders_with_cursor_keeps_statement_count(db, counter):
+    save_orders(db, make_orders(5), user_id=1)
+    first_page = [order.id for order in list_orders(db, limit=2)]
+    db.expire_all()
+    counter.reset()
+
+    second_page = list_orders(db, cursor=first_page[-1], limit=2)
+    assert all(len(order.items) == 2 for order in second_page)
+
+    assert counter.count == 2, counter.statements
+    assert [order.id for order in second_page] == [first_page[-1] - 1, first_page[-1] - 2]
+
+
+def test_find_order_loads_items_with_order(db, counter):
+    order_id = save_orders(db, make_orders(1), user_id=1)[0].id
+    db.expire_all()
+    counter.reset()
+
+    order = find_order(db, order_id)
+    assert len(order.items) == 2
+    assert counter.count == 2, counter.statements
+
+
+def test_list_orders_rejects_cursor_of_deleted_order(db):
+    orders = save_orders(db, make_orders(3), user_id=1)
+    anchor = db.get(models.Order, orders[1].id)
+    db.query(models.OrderItem).filter(models.OrderItem.order_id == anchor.id).delete()
+    db.delete(anchor)
+    db.commit()
+
+    with pytest.raises(HTTPException) as error:
+        list_orders(db, cursor=orders[1].id, limit=2)
+    assert error.value.status_code == 400
+    assert [order.id for order in list_orders(db, cursor=orders[0].id, limit=2)] == []
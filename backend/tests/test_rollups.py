@@ -0,0 +1,68 @@
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+import rollups
+from rollups import apply_status_change, backfill_rollups
+from schemas import Category, OrderStatus
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(rollups, "RESTAURANT_TIMEZONE", ZoneInfo("Europe/Istanbul"))
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([
+        models.Table(number=1, capacity=4),
+        models.MenuItem(name="Lahmacun", description="", price=60.0, category=Category.MAIN_COURSE),
+    ])
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def deliver(db, created_at: datetime, quantity: int) -> None:
+    order = models.Order(table_id=1, status=OrderStatus.READY, total_amount=60.0 * quantity, created_at=created_at)
+    order.items = [models.OrderItem(menu_item_id=1, quantity=quantity, price_at_time=60.0)]
+    db.add(order)
+    db.flush()
+    order.status = OrderStatus.DELIVERED
+    apply_status_change(db, order, OrderStatus.READY)
+    db.commit()
+
+
+def snapshot(db):
+    return {
+        "daily": sorted((row.day, row.order_count, row.item_count, row.revenue) for row in db.query(models.DailySales)),
+        "hourly": sorted((row.day, row.hour, row.order_count) for row in db.query(models.HourlySales)),
+        "tables": sorted((row.day, row.table_id, row.order_count) for row in db.query(models.TableDailySales)),
+        "items": sorted((row.day, row.menu_item_id, row.quantity) for row in db.query(models.MenuItemDailySales)),
+    }
+
+
+def test_orders_are_bucketed_by_local_day_and_hour(db):
+    # 22:30 UTC İstanbul'da ertesi günün 01:30'u
+    deliver(db, datetime(2024, 3, 1, 22, 30), quantity=2)
+    deliver(db, datetime(2024, 3, 1, 12, 0), quantity=1)
+
+    rows = snapshot(db)
+    assert rows["daily"] == [(date(2024, 3, 1), 1, 1, 60.0), (date(2024, 3, 2), 1, 2, 120.0)]
+    assert rows["hourly"] == [(date(2024, 3, 1), 15, 1), (date(2024, 3, 2), 1, 1)]
+
+
+def test_backfill_matches_live_rollups(db):
+    deliver(db, datetime(2024, 3, 1, 22, 30), quantity=2)
+    deliver(db, datetime(2024, 3, 1, 20, 59), quantity=1)
+    deliver(db, datetime(2024, 3, 3, 8, 0), quantity=3)
+    live = snapshot(db)
+
+    assert backfill_rollups(db) == 3
+    assert backfill_rollups(db, date(2024, 3, 1), date(2024, 3, 3), chunk_days=1) == 3
+    assert snapshot(db) == live
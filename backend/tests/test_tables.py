@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+from floor import set_table_status
+from qr_codes import render_missing_qr_codes
+from routes.tables import remove_table
+from schemas import TableStatus
+
+
+@pytest.fixture
+def db():
+    # Yabancı anahtarlar açık; Postgres'teki gibi yetim kayıtlar hata verir
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", lambda conn, record: conn.execute("PRAGMA foreign_keys=ON"))
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_remove_table_deletes_its_sessions(db):
+    table = models.Table(number=1, capacity=4, status=TableStatus.AVAILABLE)
+    db.add(table)
+    db.flush()
+    set_table_status(db, table, TableStatus.OCCUPIED, party_size=2)
+    db.flush()
+    set_table_status(db, table, TableStatus.AVAILABLE)
+    set_table_status(db, table, TableStatus.OCCUPIED, party_size=3)
+    db.flush()
+    session_id = db.query(models.TableSession.id).filter(models.TableSession.cleared_at.is_(None)).scalar()
+    db.add(models.Order(table_id=table.id, session_id=session_id, total_amount=0.0))
+    db.commit()
+    table_id = table.id
+
+    remove_table(db, table_id)
+
+    assert db.query(models.Table).count() == 0
+    assert db.query(models.TableSession).count() == 0
+    order = db.query(models.Order).one()
+    assert (order.table_id, order.session_id) == (None, None)
+
+
+def test_render_missing_qr_codes_fills_only_tables_without_code(db):
+    db.add_all([models.Table(number=1, capacity=4), models.Table(number=2, capacity=2)])
+    db.commit()
+
+    assert render_missing_qr_codes(db) == 2
+    assert render_missing_qr_codes(db) == 0
+    assert db.query(models.TableQRCode).count() == 2
+
+
+def test_qr_code_honours_weak_and_listed_etags(client, table):
+    first = client.get(f"/tables/{table['id']}/qr.png")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    for header in (etag, f"W/{etag}", f'"other", {etag}'):
+        response = client.get(f"/tables/{table['id']}/qr.png", headers={"If-None-Match": header})
+        assert response.status_code == 304, header
+    assert client.get(f"/tables/{table['id']}/qr.png", headers={"If-None-Match": '"other"'}).status_code == 200
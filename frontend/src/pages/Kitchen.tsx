@@ -9,43 +9,80 @@ import {
     Tabs,
     Tab,
     Box,
+    Chip,
     List,
     ListItem,
     ListItemText,
     Divider,
 } from '@mui/material';
 import { orders } from '../services/api';
-import { Order, OrderStatus } from '../types';
+import { Category, KitchenQueue, KitchenTicket, OrderStatus } from '../types';
+
+const STATION_LABELS: Record<Category, string> = {
+    [Category.APPETIZER]: 'Başlangıçlar',
+    [Category.MAIN_COURSE]: 'Ana Yemekler',
+    [Category.DESSERT]: 'Tatlılar',
+    [Category.BEVERAGE]: 'İçecekler',
+};
 
 const Kitchen: React.FC = () => {
-    const [activeOrders, setActiveOrders] = useState<Order[]>([]);
+    const [queue, setQueue] = useState<KitchenQueue | null>(null);
     const [selectedStatus, setSelectedStatus] = useState<OrderStatus>(OrderStatus.PENDING);
 
     useEffect(() => {
-        fetchOrders();
-        const interval = setInterval(fetchOrders, 30000); // Her 30 saniyede bir güncelle
-        return () => clearInterval(interval);
+        let unsubscribe: (() => void) | null = null;
+        let cancelled = false;
+
+        // İlk kuyruğu al, sonra sipariş değişikliklerinde yenile
+        const start = async () => {
+            const cursor = await fetchQueue();
+            if (cancelled) return;
+            unsubscribe = orders.subscribe(cursor, handleOrderEvent);
+        };
+        start();
+
+        return () => {
+            cancelled = true;
+            if (unsubscribe) unsubscribe();
+        };
     }, []);
 
-    const fetchOrders = async () => {
+    const fetchQueue = async (): Promise<string | null> => {
         try {
-            const data = await orders.getActiveOrders();
-            setActiveOrders(data);
+            // Kuyruk sunucuda bellekte tutulur; istasyonlara bölünmüş ve öncelik sırasına dizilmiş gelir
+            const data = await orders.getKitchenQueue();
+            setQueue(data);
+            return String(data.cursor);
         } catch (error) {
-            console.error('Error fetching orders:', error);
+            console.error('Error fetching kitchen queue:', error);
+            return null;
         }
     };
 
-    const handleStatusChange = async (orderId: number, newStatus: OrderStatus) => {
+    const handleOrderEvent = () => {
+        // Yeni sipariş, durum değişikliği ya da sıfırlama: güncel kuyruğu al
+        fetchQueue();
+    };
+
+    const handleStatusChange = async (ticket: KitchenTicket, newStatus: OrderStatus) => {
         try {
-            await orders.updateOrderStatus(orderId, newStatus);
-            fetchOrders();
-        } catch (error) {
+            await orders.updateOrderStatus(ticket.order_id, newStatus);
+        } catch (error: any) {
+            // Başka bir ekran siparişi değiştirdiyse güncel kuyruğu al
+            if (error.response?.status === 409) {
+                fetchQueue();
+                return;
+            }
             console.error('Error updating order status:', error);
         }
     };
 
-    const filteredOrders = activeOrders.filter((order) => order.status === selectedStatus);
+    const stations = (queue?.stations ?? [])
+        .map((station) => ({
+            ...station,
+            tickets: station.tickets.filter((ticket) => ticket.status === selectedStatus),
+        }))
+        .filter((station) => station.tickets.length > 0);
 
     return (
         <Container>
@@ -56,63 +93,69 @@ const Kitchen: React.FC = () => {
                 >
                     <Tab label="Bekleyen" value={OrderStatus.PENDING} />
                     <Tab label="Hazırlanan" value={OrderStatus.PREPARING} />
-                    <Tab label="Hazır" value={OrderStatus.READY} />
                 </Tabs>
             </Box>
 
-            <Grid container spacing={3}>
-                {filteredOrders.map((order) => (
-                    <Grid item xs={12} md={6} lg={4} key={order.id}>
-                        <Card>
-                            <CardContent>
-                                <Typography variant="h6" gutterBottom>
-                                    Sipariş #{order.id}
-                                </Typography>
-                                <Typography variant="body2" color="text.secondary" gutterBottom>
-                                    {new Date(order.created_at).toLocaleString()}
-                                </Typography>
-                                <List>
-                                    {order.items.map((item, index) => (
-                                        <React.Fragment key={index}>
-                                            <ListItem>
-                                                <ListItemText
-                                                    primary={item.menu_item_id}
-                                                    secondary={`Adet: ${item.quantity}`}
-                                                />
-                                            </ListItem>
-                                            {index < order.items.length - 1 && <Divider />}
-                                        </React.Fragment>
-                                    ))}
-                                </List>
-                                <Box sx={{ mt: 2, display: 'flex', justifyContent: 'space-between' }}>
-                                    <Typography variant="h6">
-                                        Toplam: {order.total_amount.toFixed(2)} TL
-                                    </Typography>
-                                    {order.status === OrderStatus.PENDING && (
-                                        <Button
-                                            variant="contained"
-                                            onClick={() => handleStatusChange(order.id, OrderStatus.PREPARING)}
-                                        >
-                                            Hazırlanıyor
-                                        </Button>
-                                    )}
-                                    {order.status === OrderStatus.PREPARING && (
-                                        <Button
-                                            variant="contained"
-                                            color="success"
-                                            onClick={() => handleStatusChange(order.id, OrderStatus.READY)}
-                                        >
-                                            Hazır
-                                        </Button>
-                                    )}
-                                </Box>
-                            </CardContent>
-                        </Card>
+            {stations.map((station) => (
+                <Box key={station.category ?? 'other'} sx={{ mb: 4 }}>
+                    <Typography variant="h5" gutterBottom>
+                        {station.category ? STATION_LABELS[station.category] : 'Diğer'}
+                    </Typography>
+                    <Grid container spacing={3}>
+                        {station.tickets.map((ticket) => (
+                            <Grid item xs={12} md={6} lg={4} key={ticket.order_id}>
+                                <Card>
+                                    <CardContent>
+                                        <Box sx={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center' }}>
+                                            <Typography variant="h6" gutterBottom>
+                                                Masa {ticket.table_id} · Sipariş #{ticket.order_id}
+                                            </Typography>
+                                            {ticket.priority === 'late' && <Chip label="Gecikti" color="error" size="small" />}
+                                        </Box>
+                                        <Typography variant="body2" color="text.secondary" gutterBottom>
+                                            {Math.floor(ticket.age_seconds / 60)} dk önce
+                                        </Typography>
+                                        <List>
+                                            {ticket.items.map((item, index) => (
+                                                <React.Fragment key={item.menu_item_id}>
+                                                    <ListItem>
+                                                        <ListItemText
+                                                            primary={item.name}
+                                                            secondary={`Adet: ${item.quantity}`}
+                                                        />
+                                                    </ListItem>
+                                                    {index < ticket.items.length - 1 && <Divider />}
+                                                </React.Fragment>
+                                            ))}
+                                        </List>
+                                        <Box sx={{ mt: 2, display: 'flex', justifyContent: 'flex-end' }}>
+                                            {ticket.status === OrderStatus.PENDING && (
+                                                <Button
+                                                    variant="contained"
+                                                    onClick={() => handleStatusChange(ticket, OrderStatus.PREPARING)}
+                                                >
+                                                    Hazırlanıyor
+                                                </Button>
+                                            )}
+                                            {ticket.status === OrderStatus.PREPARING && (
+                                                <Button
+                                                    variant="contained"
+                                                    color="success"
+                                                    onClick={() => handleStatusChange(ticket, OrderStatus.READY)}
+                                                >
+                                                    Hazır
+                                                </Button>
+                                            )}
+                                        </Box>
+                                    </CardContent>
+                                </Card>
+                            </Grid>
+                        ))}
                     </Grid>
-                ))}
-            </Grid>
+                </Box>
+            ))}
         </Container>
     );
 };
 
-export default Kitchen; 
\ No newline at end of file
+export default Kitchen;
@@ -13,10 +13,12 @@ import {
     TextField,
     Box,
 } from '@mui/material';
+import { useNavigate } from 'react-router-dom';
 import { tables, orders } from '../services/api';
-import { Table, Order, OrderStatus, OrderCreate } from '../types';
+import { Table, Order, OrderStatus, TableStatus } from '../types';
 
 const Tables: React.FC = () => {
+    const navigate = useNavigate();
     const [tableList, setTableList] = useState<Table[]>([]);
     const [selectedTable, setSelectedTable] = useState<Table | null>(null);
     const [openDialog, setOpenDialog] = useState(false);
@@ -24,29 +26,63 @@ const Tables: React.FC = () => {
     const [currentOrder, setCurrentOrder] = useState<Order | null>(null);
 
     useEffect(() => {
-        fetchTables();
-        const interval = setInterval(fetchTables, 30000); // Her 30 saniyede bir güncelle
-        return () => clearInterval(interval);
+        let unsubscribe: (() => void) | null = null;
+        let cancelled = false;
+
+        // Sürümlü listeyi al, sonra sadece masa değişikliklerini dinle
+        const start = async () => {
+            const version = await fetchTables();
+            if (cancelled) return;
+            unsubscribe = tables.subscribe(version, handleTableEvent);
+        };
+        start();
+
+        return () => {
+            cancelled = true;
+            if (unsubscribe) unsubscribe();
+        };
     }, []);
 
-    const fetchTables = async () => {
+    const fetchTables = async (): Promise<number | null> => {
         try {
-            const data = await tables.getTables();
-            setTableList(data);
+            const data = await tables.getSnapshot();
+            setTableList(data.tables);
+            return data.version;
         } catch (error) {
             console.error('Error fetching tables:', error);
+            return null;
+        }
+    };
+
+    const handleTableEvent = (type: string, data: Table) => {
+        if (type === 'reset') {
+            fetchTables();
+            return;
+        }
+        setTableList((current) => {
+            if (type === 'table_deleted') {
+                return current.filter((table) => table.id !== data.id);
+            }
+            const exists = current.some((table) => table.id === data.id);
+            return exists
+                ? current.map((table) => (table.id === data.id ? data : table))
+                : [...current, data];
+        });
+    };
+
+    const fetchCurrentOrder = async (orderId: number) => {
+        try {
+            const order = await orders.getOrder(orderId);
+            setCurrentOrder(order);
+        } catch (error) {
+            console.error('Error fetching order:', error);
         }
     };
 
     const handleTableClick = async (table: Table) => {
         setSelectedTable(table);
         if (table.current_order_id) {
-            try {
-                const order = await orders.getOrder(table.current_order_id);
-                setCurrentOrder(order);
-            } catch (error) {
-                console.error('Error fetching order:', error);
-            }
+            await fetchCurrentOrder(table.current_order_id);
         } else {
             setCurrentOrder(null);
         }
@@ -60,28 +96,17 @@ const Tables: React.FC = () => {
         setNumberOfGuests(1);
     };
 
-    const handleCreateOrder = async () => {
+    const handleSeatTable = async () => {
         if (!selectedTable) return;
 
         try {
-            const orderData: OrderCreate = {
-                table_id: selectedTable.id,
-                items: [],
-                status: OrderStatus.PENDING,
-                total_amount: 0,
-            };
-
-            const order = await orders.createOrder(orderData);
-
-            await tables.updateTable(selectedTable.id, {
-                is_occupied: true,
-                current_order_id: order.id,
-            });
-
+            // Masa açılır (oturum başlar); sipariş kalemleri menü ekranında bu masa için girilir
+            await tables.updateStatus(selectedTable.id, TableStatus.OCCUPIED, numberOfGuests);
+            const tableId = selectedTable.id;
             handleCloseDialog();
-            fetchTables();
+            navigate(`/menu?table=${tableId}`);
         } catch (error) {
-            console.error('Error creating order:', error);
+            console.error('Error seating table:', error);
         }
     };
 
@@ -89,19 +114,27 @@ const Tables: React.FC = () => {
         if (!selectedTable || !currentOrder) return;
 
         try {
-            await orders.updateOrderStatus(currentOrder.id, OrderStatus.DELIVERED);
-            await tables.updateTable(selectedTable.id, {
-                is_occupied: false,
-                current_order_id: undefined,
-            });
+            // Sadece hazır sipariş teslim edilir (ready -> delivered); bitmiş siparişte masa doğrudan boşaltılır
+            if (currentOrder.status === OrderStatus.READY) {
+                await orders.updateOrderStatus(currentOrder.id, OrderStatus.DELIVERED, currentOrder.version);
+            }
+            // Masa boşaltılınca açık oturum kapanır; dönüş süresi ve boş masa listesi güncellenir
+            await tables.updateStatus(selectedTable.id, TableStatus.AVAILABLE);
 
             handleCloseDialog();
-            fetchTables();
-        } catch (error) {
+        } catch (error: any) {
+            // Sipariş başka bir ekranda değiştiyse güncel durumunu göster
+            if (error.response?.status === 409) {
+                fetchCurrentOrder(currentOrder.id);
+                return;
+            }
             console.error('Error completing order:', error);
         }
     };
 
+    const isOrderOpen = (order: Order) =>
+        order.status === OrderStatus.PENDING || order.status === OrderStatus.PREPARING;
+
     return (
         <Container>
             <Grid container spacing={3}>
@@ -150,6 +183,11 @@ const Tables: React.FC = () => {
                             <Typography variant="body1">
                                 Durum: {currentOrder.status}
                             </Typography>
+                            {isOrderOpen(currentOrder) && (
+                                <Typography variant="body2" color="text.secondary">
+                                    Sipariş mutfakta hazır olduktan sonra tamamlanabilir.
+                                </Typography>
+                            )}
                         </Box>
                     ) : (
                         <TextField
@@ -166,12 +204,16 @@ const Tables: React.FC = () => {
                 <DialogActions>
                     <Button onClick={handleCloseDialog}>İptal</Button>
                     {currentOrder ? (
-                        <Button onClick={handleCompleteOrder} color="success">
-                            Siparişi Tamamla
+                        <Button
+                            onClick={handleCompleteOrder}
+                            color="success"
+                            disabled={isOrderOpen(currentOrder)}
+                        >
+                            {currentOrder.status === OrderStatus.READY ? 'Siparişi Tamamla' : 'Masayı Boşalt'}
                         </Button>
                     ) : (
-                        <Button onClick={handleCreateOrder} color="primary">
-                            Yeni Sipariş
+                        <Button onClick={handleSeatTable} color="primary">
+                            Masayı Aç ve Sipariş Al
                         </Button>
                     )}
                 </DialogActions>
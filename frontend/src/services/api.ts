@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { LoginRequest, RegisterRequest, AuthResponse, MenuItem, Order, OrderStatus, Table, User, Category, OrderCreate } from '../types';
+import { LoginRequest, RegisterRequest, AuthResponse, MenuItem, Order, OrderStatus, Table, TableStatus, TableTurnTime, User, Category, OrderCreate, KitchenQueue } from '../types';
 
 const API_URL = 'http://localhost:8000';
 
@@ -18,6 +18,67 @@ api.interceptors.request.use((config) => {
     return config;
 });
 
+// Sunucudan gelen SSE olaylarını dinler; bağlantı koparsa kaldığı yerden devam eder
+export const streamEvents = (
+    path: string,
+    cursor: string | null,
+    onEvent: (type: string, data: any) => void,
+): (() => void) => {
+    const controller = new AbortController();
+    let lastEventId = cursor;
+
+    const connect = async () => {
+        while (!controller.signal.aborted) {
+            try {
+                const headers: Record<string, string> = {};
+                const token = localStorage.getItem('token');
+                if (token) {
+                    headers.Authorization = `Bearer ${token}`;
+                }
+                if (lastEventId) {
+                    headers['Last-Event-ID'] = lastEventId;
+                }
+                const response = await fetch(`${API_URL}${path}`, {
+                    headers,
+                    signal: controller.signal,
+                });
+                if (!response.ok || !response.body) {
+                    throw new Error(`Stream error: ${response.status}`);
+                }
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+                while (true) {
+                    const { done, value } = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, { stream: true });
+                    let boundary = buffer.indexOf('\n\n');
+                    while (boundary >= 0) {
+                        const chunk = buffer.slice(0, boundary);
+                        buffer = buffer.slice(boundary + 2);
+                        let type = 'message';
+                        let data = '';
+                        for (const line of chunk.split('\n')) {
+                            if (line.startsWith('id: ')) lastEventId = line.slice(4);
+                            else if (line.startsWith('event: ')) type = line.slice(7);
+                            else if (line.startsWith('data: ')) data += line.slice(6);
+                        }
+                        if (data) onEvent(type, JSON.parse(data));
+                        boundary = buffer.indexOf('\n\n');
+                    }
+                }
+            } catch (error) {
+                if (controller.signal.aborted) return;
+                console.error('Event stream error:', error);
+            }
+            await new Promise((resolve) => setTimeout(resolve, 3000));
+        }
+    };
+
+    connect();
+    return () => controller.abort();
+};
+
 export const auth = {
     login: async (data: LoginRequest): Promise<AuthResponse> => {
         const formData = new FormData();
@@ -62,6 +123,13 @@ export const menu = {
         return response.data;
     },
 
+    search: async (q: string, category?: Category, limit = 10): Promise<MenuItem[]> => {
+        const response = await api.get<MenuItem[]>('/menu/search', {
+            params: { q, category, limit },
+        });
+        return response.data;
+    },
+
     getItem: async (id: number): Promise<MenuItem> => {
         const response = await api.get<MenuItem>(`/menu/items/${id}`);
         return response.data;
@@ -82,6 +150,22 @@ export const menu = {
     },
 };
 
+// Yanıt alınamayan (ağ hatası/zaman aşımı) istekleri aynı Idempotency-Key ile tekrar gönderir;
+// sunucu ilk isteği işlediyse aynı yanıtı döner, sipariş iki kez oluşmaz
+const sendIdempotent = async <T,>(
+    request: (headers: Record<string, string>) => Promise<{ data: T }>,
+    retries = 2
+): Promise<T> => {
+    const headers = { 'Idempotency-Key': crypto.randomUUID() };
+    for (let attempt = 0; ; attempt++) {
+        try {
+            return (await request(headers)).data;
+        } catch (error: any) {
+            if (error.response || attempt >= retries) throw error;
+        }
+    }
+};
+
 export const orders = {
     getOrders: async (status?: OrderStatus): Promise<Order[]> => {
         const response = await api.get<Order[]>('/orders', {
@@ -95,20 +179,27 @@ export const orders = {
         return response.data;
     },
 
-    getOrder: async (id: number): Promise<Order> => {
-        const response = await api.get<Order>(`/orders/${id}`);
+    getKitchenQueue: async (): Promise<KitchenQueue> => {
+        const response = await api.get<KitchenQueue>('/orders/kitchen-queue');
         return response.data;
     },
 
-    createOrder: async (data: OrderCreate): Promise<Order> => {
-        const response = await api.post<Order>('/orders', data);
-        return response.data;
-    },
+    subscribe: (cursor: string | null, onEvent: (type: string, data: any) => void) =>
+        streamEvents('/orders/stream', cursor, onEvent),
 
-    updateOrderStatus: async (id: number, status: OrderStatus): Promise<Order> => {
-        const response = await api.put<Order>(`/orders/${id}/status`, { status });
+    getOrder: async (id: number): Promise<Order> => {
+        const response = await api.get<Order>(`/orders/${id}`);
         return response.data;
     },
+
+    createOrder: (data: OrderCreate): Promise<Order> =>
+        sendIdempotent((headers) => api.post<Order>('/orders', data, { headers })),
+
+    // version verilirse sipariş bu arada başka bir ekrandan değiştirildiyse 409 döner
+    updateOrderStatus: (id: number, status: OrderStatus, version?: number): Promise<Order> =>
+        sendIdempotent((headers) =>
+            api.put<Order>(`/orders/${id}/status`, null, { params: { status, version }, headers })
+        ),
 };
 
 export const tables = {
@@ -117,6 +208,28 @@ export const tables = {
         return response.data;
     },
 
+    getSnapshot: async (): Promise<{ version: number; tables: Table[] }> => {
+        const response = await api.get<{ version: number; tables: Table[] }>('/tables/snapshot');
+        return response.data;
+    },
+
+    subscribe: (version: number | null, onEvent: (type: string, data: any) => void) =>
+        streamEvents('/tables/stream', version === null ? null : String(version), onEvent),
+
+    getFreeTables: async (minCapacity: number, limit = 10): Promise<Table[]> => {
+        const response = await api.get<Table[]>('/tables/free', {
+            params: { min_capacity: minCapacity, limit },
+        });
+        return response.data;
+    },
+
+    getTurnTimes: async (days?: number): Promise<TableTurnTime[]> => {
+        const response = await api.get<TableTurnTime[]>('/tables/turn-times', {
+            params: { days },
+        });
+        return response.data;
+    },
+
     getTable: async (id: number): Promise<Table> => {
         const response = await api.get<Table>(`/tables/${id}`);
         return response.data;
@@ -132,6 +245,14 @@ export const tables = {
         return response.data;
     },
 
+    // OCCUPIED'a geçişte masa oturumu açılır; partySize dönüş süresi raporlarında kullanılır
+    updateStatus: async (id: number, status: TableStatus, partySize?: number): Promise<Table> => {
+        const response = await api.put<Table>(`/tables/${id}/status`, null, {
+            params: { status, party_size: partySize },
+        });
+        return response.data;
+    },
+
     deleteTable: async (id: number): Promise<void> => {
         await api.delete(`/tables/${id}`);
     },
@@ -84,9 +84,32 @@ export interface Order {
     total_amount: number;
     created_at: string;
     updated_at: string;
+    version: number;
     items: OrderItem[];
 }
 
+export interface KitchenTicketItem {
+    menu_item_id: number;
+    name: string;
+    quantity: number;
+}
+
+export interface KitchenTicket {
+    order_id: number;
+    table_id: number;
+    status: OrderStatus;
+    created_at: string | null;
+    age_seconds: number;
+    priority: 'late' | 'preparing' | 'pending';
+    items: KitchenTicketItem[];
+}
+
+export interface KitchenQueue {
+    cursor: number;
+    active_orders: number;
+    stations: { category: Category | null; tickets: KitchenTicket[] }[];
+}
+
 export interface OrderCreate {
     table_id: number;
     items: OrderItemCreate[];
@@ -100,6 +123,17 @@ export interface Table {
     capacity: number;
     is_occupied: boolean;
     current_order_id?: number;
+    version?: number;
+    seated_at?: string | null;
+    party_size?: number | null;
+}
+
+export interface TableTurnTime {
+    table_id: number;
+    number: number | null;
+    sessions: number;
+    average_turn_minutes: number | null;
+    occupied_minutes: number | null;
 }
 
 export interface Reservation {